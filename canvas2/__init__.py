@@ -12,6 +12,11 @@ def create_app(test_config=None):
     app.secret_key = os.environ.get("SECRET_KEY")
     app.config["MONGO_URI"] = os.environ.get("MONGO_URI")
 
+    # minimum jaccard similarity a pair of submissions needs to be reported
+    app.config["SIMILARITY_THRESHOLD"] = float(
+        os.environ.get("SIMILARITY_THRESHOLD", 0.3)
+    )
+
     # handle testing config, if it was passed in
     # we call this second because we want to overwite MONGO_URI
     # see: conftest.py:pytest_configure()
@@ -21,6 +26,15 @@ def create_app(test_config=None):
     # init db
     init_db(app)
 
+    # convert submissions stored in older formats, and score submissions
+    # that were never scored, in the background, loading the tokenizers
+    # shared by every request thread on the way
+    # NOTE: skipped while testing, so tests see a predictable database
+    if not app.config.get("TESTING"):
+        from .utils.db import db_conn
+        from .utils.migrate import start_migrator
+        start_migrator(db_conn.db, app.config["SIMILARITY_THRESHOLD"])
+
     # import blueprints
     from .blueprints import frontend, backend, auth, invites, admin
     app.register_blueprint(frontend)
@@ -3,7 +3,10 @@ import json
 from flask import Blueprint, request, session, render_template, redirect, \
     url_for, flash, abort
 
+from ..plagiarism.engines import engineStats
+from ..plagiarism.jaccard.jaccardsimilarity import normalizationCache
 from ..utils.db import db_conn
+from ..utils.jobs import queue_stats
 
 # create main frontend blueprint
 admin = Blueprint(
@@ -147,3 +150,25 @@ def search_users():
         usersDict[user['_id']] = user
 
     return json.dumps(usersDict, default=str)
+
+
+@admin.route("/stats", methods=["GET"])
+def stats():
+    """
+    Returns runtime statistics of this worker process.
+    """
+
+    # if not logged in, send to login
+    if "id" not in session:
+        flash("You are not logged in!", "error")
+        return redirect(url_for("auth.login"))
+
+    # Prevents page access by non-admins
+    if session["role"] < 4:
+        abort(401)
+
+    return json.dumps({
+        "normalization_cache": normalizationCache.stats(),
+        "jobs": queue_stats(db_conn.db),
+        "engines": engineStats(),
+    })
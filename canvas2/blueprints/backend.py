@@ -1,13 +1,17 @@
 from bson import ObjectId
 from datetime import datetime
-from flask import Blueprint, request, session, redirect, url_for, abort
+from flask import Blueprint, request, session, redirect, url_for, abort, \
+    current_app
 import json
-import re
 
-from ..plagiarism.jaccard.jaccardsimilarity import shinglesString
-from ..plagiarism.simhash.similarsubstrings import getCommonSubstrings,\
-    parseText
+from ..plagiarism.engines import enginesFor, getEngine
 from ..utils.db import db_conn
+from ..utils.jobs import enqueue
+from ..utils.lsh import remove_assignment
+from ..utils.postings import remove_postings, top_candidates
+from ..utils.reports import build_report, cache_report, cached_report, \
+    invalidate_assignment
+from ..utils.similarity import forget_submission
 
 
 # create main backend blueprint
@@ -156,18 +160,21 @@ def submit_assignment():
         abort(400)  # bad request
 
     # save submission to db
-    db_conn.db.submissions.insert_one(
+    # NOTE: fingerprinting and scoring are left to canvas2-worker, so the
+    #       student does not wait on them. `status` tracks its progress
+    new_sub = db_conn.db.submissions.insert_one(
         {
             "assignment": ObjectId(assgid),
             "class": assignment["class"],
             "user": ObjectId(userid),
             "contents": contents,
-            "parsedContents": shinglesString(contents),
+            "status": "queued",
             "timestamp": datetime.now(),
             "comments": [],
             "grade": 0.0,
         }
     )
+    enqueue(db_conn.db, "fingerprint", {"submission": new_sub.inserted_id})
 
     # return redirect to same page, forcing a refresh
     return redirect(request.referrer)
@@ -253,6 +260,9 @@ def submission_info(sid):
                 "comments": 1,
                 "grade": 1,
                 "simscore": 1,
+                "containment": 1,
+                "coverage": 1,
+                "status": 1,
             }
         )
 
@@ -295,6 +305,50 @@ def submission_info(sid):
         return redirect(request.referrer)
 
 
+@backend.route("/s/<sid>/status", methods=["GET"])
+def submission_status(sid):
+    """Returns how far along plagiarism checking of a submission is."""
+
+    # if not logged in, send to login
+    if "id" not in session:
+        return redirect(url_for("auth.login"))
+
+    sub = db_conn.db.submissions.find_one(
+        {"_id": ObjectId(sid)},
+        {
+            "user": 1,
+            "class": 1,
+            "status": 1,
+            "simscore": 1,
+            "containment": 1,
+            "coverage": 1,
+        }
+    )
+    if not sub:
+        abort(404)  # not found
+
+    # students may only poll their own submissions, everyone else must be
+    # enrolled in the course
+    if session["role"] < 2:
+        if sub["user"] != ObjectId(session["id"]):
+            abort(403)  # forbidden
+    elif session["role"] != 4:
+        enrollment = db_conn.db.enrollments.find_one(
+            {"user": ObjectId(session["id"]), "class": sub["class"]}
+        )
+        if not enrollment:
+            abort(403)  # forbidden
+
+    # submissions made before the job queue have no status, but are scored
+    # NOTE: students only get to see the status, not the score
+    status = {"status": sub.get("status", "done")}
+    if session["role"] >= 2:
+        status["simscore"] = sub.get("simscore")
+        status["containment"] = sub.get("containment")
+        status["coverage"] = sub.get("coverage")
+    return json.dumps(status)
+
+
 @backend.route('/update-grades', methods=["POST"])
 def update_grades():
     """Allows the updating of grades for multiple submissions"""
@@ -360,6 +414,8 @@ def delete_assignment():
     db_conn.db.assignments.delete_one({
         "_id": ObjectId(request.form["assg-id"])
     })
+    remove_assignment(db_conn.db, ObjectId(request.form["assg-id"]))
+    invalidate_assignment(db_conn.db, ObjectId(request.form["assg-id"]))
 
     # return redirect to same page, forcing a refresh
     code = request.form['crs-code']
@@ -386,9 +442,17 @@ def delete_submission():
         abort(403)  # forbidden
 
     # remove the assignment from the database
-    db_conn.db.submissions.delete_one({
-        "_id": ObjectId(request.form["sub-id"])
-    })
+    submission = db_conn.db.submissions.find_one_and_delete(
+        {"_id": ObjectId(request.form["sub-id"])},
+        {"seq": 1, "winnowing": 1}
+    )
+    if submission:
+        remove_postings(db_conn.db, submission)
+    forget_submission(
+        db_conn.db,
+        ObjectId(request.form["sub-id"]),
+        current_app.config["SIMILARITY_THRESHOLD"],
+    )
 
     # return redirect to same page, forcing a refresh
     return redirect(request.referrer)
@@ -410,17 +474,11 @@ def similarity_report(sid):
     if not user or not user["role"] >= 2:
         abort(403)
 
-    # Gets a submission's contents and comments
+    # Gets the submission's closest match and course
     if request.method == "GET":
         sub_info = db_conn.db.submissions.find_one(
             {"_id": ObjectId(sid)},
-            {
-                "contents": 1,
-                "comments": 1,
-                "grade": 1,
-                "simscore": 1,
-                "simsub": 1,
-            }
+            {"simsub": 1, "class": 1}
         )
 
     try:
@@ -428,47 +486,188 @@ def similarity_report(sid):
     except Exception:
         return json.dumps({'error': 'No similar submissions'}, default=str)
 
-    curr_contents = sub_info["contents"]
+    # reports are cached until either submission is deleted or rescored, or
+    # the course's engines change
+    # NOTE: checked first, so a cached report loads neither submission
+    course = db_conn.db.classes.find_one({"_id": sub_info.get("class")})
+    selected = enginesFor(course)
+    cached = cached_report(
+        db_conn.db, sub_info["_id"], similar_sub_id, selected
+    )
+    if cached is not None:
+        return json.dumps(cached, default=str)
+
+    # Gets a submission's contents and comments
+    sub_info = db_conn.db.submissions.find_one(
+        {"_id": ObjectId(sid)},
+        {
+            "contents": 1,
+            "comments": 1,
+            "grade": 1,
+            "simscore": 1,
+            "simsub": 1,
+            "containment": 1,
+            "coverage": 1,
+            "class": 1,
+            "assignment": 1,
+            **{engine.field: 1 for engine in selected},
+        }
+    )
+    if not sub_info:
+        return json.dumps({'error': 'No similar submissions'}, default=str)
 
     # Get the contents of the similar submission
-    similar_contents = db_conn.db.submissions.find_one(
+    similar_sub = db_conn.db.submissions.find_one(
         {"_id": ObjectId(similar_sub_id)},
         {
             "contents": 1,
+            **{engine.field: 1 for engine in selected},
         }
     )
 
-    curr_contents_parsed = parseText(curr_contents)
-    similar_contents_parsed = parseText(similar_contents["contents"])
-    similar_sentences = getCommonSubstrings(
-        curr_contents_parsed, similar_contents_parsed
+    res, sources, complete = build_report(
+        db_conn.db, sub_info, similar_sub, selected
     )
 
-    sentences = []
-    for i, j in similar_sentences:
-        s1 = " ".join(curr_contents_parsed[i - 1])
-        s2 = " ".join(similar_contents_parsed[j - 1])
-
-        s1 = re.sub(r'\s+([^\s\w]|_)+', r'\1', s1)
-        s2 = re.sub(r'\s+([^\s\w]|_)+', r'\1', s2)
-
-        sentences.append((s1, s2))
-
-    res = ""
-    res += ("--------------- Similarity Report ---------------")
-    res += ("\n")
-    res += ("Similarity Score: " + str(sub_info["simscore"]))
-    res += ("\n")
-    res += ("# of Common Sentences: " + str(len(similar_sentences)))
-    res += ("\n")
-    res += ("\n")
-    res += ("--------------- Similar Sentences ---------------")
-    res += ("\n")
-    for s1, s2 in sentences:
-        res += ("Original: " + s1)
-        res += ("\n")
-        res += ("Similar: " + s2)
-        res += ("\n")
-        res += ("\n")
-
+    # reports missing a section are built again once it is available
+    if complete:
+        cache_report(
+            db_conn.db, sub_info, similar_sub_id, selected, res, sources
+        )
     return json.dumps(res, default=str)
+
+
+@backend.route("/s/<sid>/cross-matches", methods=["GET"])
+def cross_matches(sid):
+    """Returns the submissions in any assignment or course that share the
+    most passages with this one, e.g. an essay reused from an earlier term.
+    """
+
+    # if not logged in, send to login
+    if "id" not in session:
+        return redirect(url_for("auth.login"))
+
+    # Prevents access by students
+    if session["role"] < 2:
+        abort(401)
+
+    # ensure user exists and is ta role or greater
+    user = db_conn.db.users.find_one({"_id": ObjectId(session["id"])})
+    if not user or not user["role"] >= 2:
+        abort(403)  # forbidden
+
+    # ensure user is enrolled in course
+    sub = db_conn.db.submissions.find_one(
+        {"_id": ObjectId(sid)},
+        {"class": 1, "seq": 1, "winnowing": 1}
+    )
+    if not sub:
+        abort(404)  # not found
+    enrollment = db_conn.db.enrollments.find_one(
+        {"user": user["_id"], "class": sub["class"]}
+    )
+    if session["role"] != 4 and not enrollment:
+        abort(403)  # forbidden
+
+    # not fingerprinted yet
+    if "winnowing" not in sub:
+        return json.dumps([])
+
+    matches = []
+    for other, shared, score in top_candidates(db_conn.db, sub):
+        assignment = db_conn.db.assignments.find_one(
+            {"_id": other["assignment"]},
+            {"title": 1}
+        )
+        matches.append({
+            "submission": other["_id"],
+            "assignment": other["assignment"],
+            "title": assignment["title"] if assignment else None,
+            "class": other["class"],
+            "shared": shared,
+            "score": score,
+        })
+
+    return json.dumps(matches, default=str)
+
+
+@backend.route("/a/<aid>/similarity-matrix", methods=["GET"])
+def similarity_matrix(aid):
+    """Returns the similarity of every pair of submissions to an assignment.
+
+    The whole matrix is computed in one vectorized pass over the stored
+    fingerprints, and is used to draw the class heatmap.
+    """
+
+    # if not logged in, send to login
+    if "id" not in session:
+        return redirect(url_for("auth.login"))
+
+    # Prevents access by students
+    if session["role"] < 2:
+        abort(401)
+
+    # ensure user exists and is ta role or greater
+    user = db_conn.db.users.find_one({"_id": ObjectId(session["id"])})
+    if not user or not user["role"] >= 2:
+        abort(403)  # forbidden
+
+    # ensure user is enrolled in course
+    assignment = db_conn.db.assignments.find_one({"_id": ObjectId(aid)})
+    if not assignment:
+        abort(404)  # not found
+    enrollment = db_conn.db.enrollments.find_one(
+        {"user": user["_id"], "class": assignment["class"]}
+    )
+    if session["role"] != 4 and not enrollment:
+        abort(403)  # forbidden
+
+    # any registered engine can draw the heatmap, minhash by default
+    try:
+        engine = getEngine(request.args.get("engine", "minhash"))
+    except KeyError:
+        abort(400)  # bad request
+
+    # load every fingerprinted submission along with its author's name
+    subs = db_conn.db.submissions.aggregate(
+        [
+            {
+                "$match": {
+                    "assignment": ObjectId(aid),
+                    engine.field: {"$exists": True},
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "user",
+                    "foreignField": "_id",
+                    "as": "user",
+                }
+            },
+            {"$unwind": {"path": "$user"}},
+            {
+                "$project": {
+                    engine.field: 1,
+                    "user.firstname": 1,
+                    "user.lastname": 1,
+                }
+            },
+            {"$sort": {"user.lastname": 1, "user.firstname": 1}},
+        ]
+    )
+    # NOTE: fingerprints made by an older version of the engine are left
+    #       out until the migrator fingerprints them again, see
+    #       utils/migrate.py
+    subs = [sub for sub in subs if engine.isCurrent(sub[engine.field])]
+
+    matrix = engine.batchCompare([sub[engine.field] for sub in subs])
+
+    return json.dumps({
+        "submissions": [str(sub["_id"]) for sub in subs],
+        "labels": [
+            f"{sub['user']['lastname']}, {sub['user']['firstname']}"
+            for sub in subs
+        ],
+        "matrix": matrix.round(2).tolist(),
+    })
@@ -1,8 +1,6 @@
 from bson import ObjectId
 from flask import Blueprint, session, render_template, redirect, url_for, abort
-from collections import defaultdict
 
-from ..plagiarism.jaccard.jaccardsimilarity import similarityScore
 from ..utils.db import db_conn
 
 
@@ -190,95 +188,15 @@ def manage_assignment(aid, cid):
             {
                 "$project": {
                     "user.password": 0,
-                    "user.email": 0,
                     "assignment.assignment": 0,
                     "assignment.class": 0,
                     "assignment.user": 0,
                     "assignment.contents": 0,
-                }
-            },
-        ]
-    )
-
-    # sets the similarity score for each student submission
-    simSubs = defaultdict(list)
-    list_submissions = [sub for sub in student_subs if len(sub["assignment"]) > 0]  # noqa: E501
-    for idx, submission in enumerate(list_submissions):
-        try:
-            curr_id = submission["assignment"][0]["_id"]
-            curr_contents = eval(submission["assignment"][0]["parsedContents"])
-        except Exception:
-            continue
-        for submission2 in list_submissions[:idx] + list_submissions[idx+1:]:
-            try:
-                comp_id = submission2["assignment"][0]["_id"]
-                comp_contents = eval(
-                    submission2["assignment"][0]["parsedContents"]
-                )
-            except Exception:
-                continue
-            simScore = round(similarityScore(curr_contents, comp_contents), 2)
-            simSubs[curr_id].append((comp_id, simScore))
-        if len(simSubs[curr_id]) > 0:
-            mostSimilar = max(simSubs[curr_id], key=lambda x: x[1])
-            db_conn.db.submissions.update_one(
-                {'_id': ObjectId(curr_id)},
-                {'$set': {'simscore': mostSimilar[1]}}
-            )
-            db_conn.db.submissions.update_one(
-                {'_id': ObjectId(curr_id)},
-                {'$set': {'simsub': mostSimilar[0]}}
-            )
-
-    # Builds an object containing all students and their submissions
-    student_subs = db_conn.db.enrollments.aggregate(
-        [
-            {"$match": {"class": ObjectId(cid)}},
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "user",
-                    "foreignField": "_id",
-                    "as": "user",
-                }
-            },
-            {"$unwind": {"path": "$user"}},
-            {
-                "$redact": {
-                    "$cond": {
-                        "if": {"$lt": ["$user.role", 2]},
-                        "then": "$$KEEP",
-                        "else": "$$PRUNE",
-                    }
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "submissions",
-                    "let": {"e_assg": ObjectId(aid), "e_user": "$user._id"},
-                    "pipeline": [
-                        {
-                            "$match": {
-                                "$expr": {
-                                    "$and": [
-                                        {"$eq": ["$$e_user", "$user"]},
-                                        {"$eq": ["$$e_assg", "$assignment"]},
-                                    ]
-                                }
-                            }
-                        }
-                    ],
-                    "as": "assignment",
-                }
-            },
-            {
-                "$project": {
-                    "user.password": 0,
-                    "assignment.assignment": 0,
-                    "assignment.class": 0,
-                    "assignment.user": 0,
-                    "assignment.contents": 0,
-                    "assignment.parsedContents": 0
+                    "assignment.parsedContents": 0,
+                    "assignment.signature": 0,
+                    "assignment.fingerprint": 0,
+                    "assignment.winnowing": 0,
+                    "assignment.simhash": 0,
                 }
             },
         ]
@@ -0,0 +1,219 @@
+# flake8: noqa
+"""
+Benchmark of the plagiarism engines, run with: python -m canvas2.plagiarism.benchmark --help
+Measures fingerprint and compare throughput, peak memory and stored bytes of every engine over a synthetic
+corpus paraphrased from testdocs, and detection quality over the labeled testdocs pairs. Results are written
+as JSON, so runs of different releases can be compared.
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .engines import engines, getEngine
+
+
+testDirPath = Path(__file__).parent / "testdocs"
+
+# (original, test document, whether the test document was plagiarized from the original)
+# t1-t3 are the US Constitution paraphrased, spun and laundered through a translator, t4-t5 only share topic
+# s5 is the AP sample essay ran through a spinner, s1-s4 are other students' essays on the same prompt
+LABELED_PAIRS = [
+    ("original1.txt", "t1.txt", True),
+    ("original1.txt", "t2.txt", True),
+    ("original1.txt", "t3.txt", True),
+    ("original1.txt", "t4.txt", False),
+    ("original1.txt", "t5.txt", False),
+    ("original2.txt", "s1.txt", False),
+    ("original2.txt", "s2.txt", False),
+    ("original2.txt", "s3.txt", False),
+    ("original2.txt", "s4.txt", False),
+    ("original2.txt", "s5.txt", True),
+]
+
+# number of random pairs timed with compare, and most documents compared at once with batchCompare
+COMPARE_PAIRS = 1000
+BATCH_DOCS = 500
+
+
+def readDoc(name: str) -> str:
+    with open(Path(testDirPath, name), "r") as f:
+        return f.read()
+
+
+def paraphrase(text: str, rng: random.Random, vocabulary: list, rate: float = 0.15) -> str:
+    """
+    Return a text reworded like a student hiding plagiarism: words dropped, swapped and replaced at random
+    """
+    words = text.split()
+    out = []
+    i = 0
+    while i < len(words):
+        roll = rng.random()
+        if roll < rate / 3:
+            pass
+        elif roll < 2 * rate / 3 and i + 1 < len(words):
+            out += [words[i + 1], words[i]]
+            i += 1
+        elif roll < rate:
+            out.append(rng.choice(vocabulary))
+        else:
+            out.append(words[i])
+        i += 1
+    return " ".join(out)
+
+
+def syntheticCorpus(size: int, seed: int = 0):
+    """
+    Yield size synthetic submissions, one at a time so the corpus never has to fit in memory
+    Each is a paraphrase of a testdoc, or of a splice of sentences from two testdocs
+    """
+    rng = random.Random(seed)
+    docs = [readDoc(p.name) for p in sorted(testDirPath.glob("*.txt"))]
+    sentences = [re.split(r"(?<=[.!?])\s+", doc) for doc in docs]
+    vocabulary = sorted({word for doc in docs for word in doc.split()})
+
+    for _ in range(size):
+        if rng.random() < 0.5:
+            base = rng.choice(docs)
+        else:
+            first, second = rng.sample(sentences, 2)
+            cut1, cut2 = rng.randrange(len(first) + 1), rng.randrange(len(second) + 1)
+            base = " ".join(first[:cut1] + second[cut2:])
+        yield paraphrase(base, rng, vocabulary, rate=rng.uniform(0.0, 0.4))
+
+
+def detectionQuality(engine) -> dict:
+    """
+    Return the scores of the labeled testdocs pairs, and how well they separate plagiarized from original work
+    auc is the fraction of (plagiarized, original) pairs in which the plagiarized pair scores higher
+    """
+    fingerprints = {}
+    pairs = []
+    for original, test, plagiarized in LABELED_PAIRS:
+        for name in (original, test):
+            if name not in fingerprints:
+                fingerprints[name] = engine.fingerprint(readDoc(name))
+        score = float(engine.compare(fingerprints[original], fingerprints[test]))
+        pairs.append({"original": original, "test": test, "plagiarized": plagiarized, "score": round(score, 4)})
+
+    positives = [p["score"] for p in pairs if p["plagiarized"]]
+    negatives = [p["score"] for p in pairs if not p["plagiarized"]]
+    ranked = sum((p > n) + 0.5 * (p == n) for p in positives for n in negatives)
+    return {
+        "pairs": pairs,
+        "min_plagiarized": min(positives),
+        "max_original": max(negatives),
+        "separated": min(positives) > max(negatives),
+        "auc": round(ranked / (len(positives) * len(negatives)), 4),
+    }
+
+
+def _runEngine(engine, size: int, seed: int) -> tuple:
+    """
+    Return the fingerprints of a synthetic corpus, and the seconds spent fingerprinting, comparing and batch comparing
+    """
+    # fingerprint every document, keeping only the fingerprints
+    fingerprints = []
+    start = time.perf_counter()
+    for text in syntheticCorpus(size, seed):
+        fingerprints.append(engine.fingerprint(text))
+    fingerprintSeconds = time.perf_counter() - start
+
+    # compare random pairs one at a time, as submission-time scoring does
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(range(size), 2)) for _ in range(COMPARE_PAIRS)] if size > 1 else []
+    start = time.perf_counter()
+    for i, j in pairs:
+        engine.compare(fingerprints[i], fingerprints[j])
+    compareSeconds = time.perf_counter() - start
+
+    # compare a class-sized batch at once, as the heatmap does
+    start = time.perf_counter()
+    engine.batchCompare(fingerprints[:BATCH_DOCS])
+    batchSeconds = time.perf_counter() - start
+
+    return fingerprints, len(pairs), fingerprintSeconds, compareSeconds, batchSeconds
+
+
+def benchmarkEngine(engine, size: int, seed: int = 0, measureMemory: bool = True) -> dict:
+    """
+    Return the throughput, peak memory and storage of an engine over a synthetic corpus of size documents
+    Peak memory is measured with tracemalloc in a second pass, since tracing slows everything down several times
+    It covers the Python and numpy allocations of that pass only
+    """
+    fingerprints, comparePairs, fingerprintSeconds, compareSeconds, batchSeconds = _runEngine(engine, size, seed)
+
+    peak = None
+    if measureMemory:
+        tracemalloc.start()
+        try:
+            _runEngine(engine, size, seed)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    storedBytes = sum(len(data) for data in fingerprints)
+    return {
+        "engine": engine.name,
+        "version": engine.version,
+        "documents": size,
+        "fingerprint_seconds": round(fingerprintSeconds, 6),
+        "fingerprints_per_second": round(size / fingerprintSeconds, 2) if fingerprintSeconds else None,
+        "compare_pairs": comparePairs,
+        "compare_seconds_per_pair": round(compareSeconds / comparePairs, 9) if comparePairs else None,
+        "batch_documents": min(size, BATCH_DOCS),
+        "batch_seconds": round(batchSeconds, 6),
+        "peak_memory_bytes": peak,
+        "stored_bytes": storedBytes,
+        "stored_bytes_per_document": round(storedBytes / size, 2) if size else None,
+    }
+
+
+def runBenchmark(engineNames: list, sizes: list, seed: int = 0, measureMemory: bool = True) -> dict:
+    """
+    Return the full benchmark results of some engines, as written to the results file
+    """
+    selected = [getEngine(name) for name in engineNames]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": seed,
+        "quality": {engine.name: detectionQuality(engine) for engine in selected},
+        "scale": [benchmarkEngine(engine, size, seed, measureMemory) for size in sizes for engine in selected],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the plagiarism engines")
+    parser.add_argument("--engines", nargs="+", default=sorted(engines), help="engines to run (default: all registered)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000], help="synthetic corpus sizes, e.g. 1000 10000 100000")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument("--output", default="benchmark.json", help="results file")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced pass that measures peak memory")
+    args = parser.parse_args()
+
+    results = runBenchmark(args.engines, args.sizes, args.seed, not args.no_memory)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, quality in results["quality"].items():
+        print(f"{name}: auc {quality['auc']}, separated {quality['separated']}")
+    for row in results["scale"]:
+        print(f"{row['engine']} x {row['documents']}: {row['fingerprints_per_second']} fingerprints/s, "
+              f"{row['compare_seconds_per_pair']} s/compare, peak {row['peak_memory_bytes']} B, "
+              f"{row['stored_bytes_per_document']} B/doc")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# flake8: noqa
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+
+import numpy as np
+
+from .fingerprint import encodeFingerprint, decodeFingerprint, checkFingerprint
+from .jaccard.jaccardsimilarity import shinglesFingerprint, wordsFingerprint
+from .jaccard.matrix import jaccardMatrix, signatureMatrix
+from .jaccard import minhash
+from .simhash import similarsubstrings
+from .winnowing import winnowing
+
+
+# engines used when neither the deployment nor a course picks any, see enginesFor
+DEFAULT_ENGINES = ("minhash", "winnowing", "simhash")
+
+# comma-separated engine names overriding DEFAULT_ENGINES for a whole deployment
+DEPLOYMENT_ENGINES = tuple(
+    name.strip() for name in os.environ.get("PLAGIARISM_ENGINES", ",".join(DEFAULT_ENGINES)).split(",") if name.strip()
+)
+
+
+class Engine(ABC):
+    """
+    A plagiarism engine: turns a text into a stored fingerprint, and compares or explains fingerprints
+    Subclasses set name, version and field (the submission field fingerprints are stored in),
+    must implement _fingerprint and _compare, and may override _fingerprintWords (setting usesWords), _batchCompare
+    and _explain. Every public call is timed per engine,
+    so the throughput of engines can be compared on live traffic
+    """
+    name = None
+    version = None
+    field = None
+
+    # title of the similarity report section made by explain
+    title = None
+
+    # whether fingerprintWords is supported, i.e. fingerprints only depend on the normalized words
+    usesWords = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _timed(self, operation: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                calls, seconds = self._stats.get(operation, (0, 0.0))
+                self._stats[operation] = (calls + 1, seconds + elapsed)
+
+    def encode(self, k: int, *arrays) -> bytes:
+        """
+        Return arrays packed as a fingerprint of this engine and version
+        """
+        return encodeFingerprint(self.name, self.version, k, *arrays)
+
+    def decode(self, data: bytes) -> tuple:
+        """
+        Return the arrays of a fingerprint, raise ValueError if another engine or version made it
+        """
+        return checkFingerprint(decodeFingerprint(data), self.name, self.version).arrays
+
+    def isCurrent(self, data: bytes) -> bool:
+        """
+        Return whether a stored fingerprint was made by this engine and version
+        """
+        try:
+            self.decode(data)
+        except ValueError:
+            return False
+        return True
+
+    def fingerprint(self, text: str) -> bytes:
+        """
+        Return the fingerprint of a text
+        """
+        return self._timed("fingerprint", self._fingerprint, text)
+
+    def fingerprintWords(self, words: list) -> bytes:
+        """
+        Return the fingerprint of a text from its normalized words (see parseText), so they can be reused
+        Only supported by engines with usesWords set, others need the raw text, e.g. to record positions in it
+        """
+        return self._timed("fingerprint", self._fingerprintWords, words)
+
+    def compare(self, data1: bytes, data2: bytes) -> float:
+        """
+        Return the similarity (0 to 1) of the texts behind two fingerprints
+        """
+        return self._timed("compare", self._compare, data1, data2)
+
+    def batchCompare(self, fingerprints: list) -> np.ndarray:
+        """
+        Return the N x N similarity matrix of many fingerprints
+        """
+        return self._timed("batchCompare", self._batchCompare, fingerprints)
+
+    def explain(self, data1: bytes, data2: bytes, text1: str, text2: str) -> list:
+        """
+        Return the (passage1, passage2) pairs of text that make two fingerprints similar
+        """
+        return self._timed("explain", self._explain, data1, data2, text1, text2)
+
+    def stats(self) -> dict:
+        """
+        Return the number of calls and seconds spent in each operation
+        """
+        with self._lock:
+            return {
+                op: {"calls": calls, "seconds": round(seconds, 6)}
+                for op, (calls, seconds) in self._stats.items()
+            }
+
+    @abstractmethod
+    def _fingerprint(self, text: str) -> bytes:
+        ...
+
+    def _fingerprintWords(self, words: list) -> bytes:
+        raise TypeError(f"engine {self.name} needs the raw text, it does not fingerprint words")
+
+    @abstractmethod
+    def _compare(self, data1: bytes, data2: bytes) -> float:
+        ...
+
+    def _batchCompare(self, fingerprints: list) -> np.ndarray:
+        # engines without a vectorized path compare every pair
+        matrix = np.eye(len(fingerprints))
+        for i in range(len(fingerprints)):
+            for j in range(i + 1, len(fingerprints)):
+                matrix[i, j] = matrix[j, i] = self._compare(fingerprints[i], fingerprints[j])
+        return matrix
+
+    def _explain(self, data1: bytes, data2: bytes, text1: str, text2: str) -> list:
+        return []
+
+
+class MinHashEngine(Engine):
+    """
+    MinHash signatures of 5-character shingles, the engine behind simscore and the LSH index
+    """
+    name = minhash.ENGINE
+    version = minhash.VERSION
+    field = "fingerprint"
+    usesWords = True
+
+    def _fingerprint(self, text: str) -> bytes:
+        return shinglesFingerprint(text)
+
+    def _fingerprintWords(self, words: list) -> bytes:
+        return wordsFingerprint(words)
+
+    def _compare(self, data1: bytes, data2: bytes) -> float:
+        return minhash.estimateSimilarity(minhash.signatureFromFingerprint(data1), minhash.signatureFromFingerprint(data2))
+
+    def _batchCompare(self, fingerprints: list) -> np.ndarray:
+        return signatureMatrix([minhash.signatureFromFingerprint(data) for data in fingerprints])
+
+
+class WinnowingEngine(Engine):
+    """
+    Winnowed word k-grams with their positions, explains matches as shared passages
+    """
+    name = winnowing.ENGINE
+    version = winnowing.VERSION
+    field = "winnowing"
+    title = "Matched Passages"
+
+    def _fingerprint(self, text: str) -> bytes:
+        return winnowing.winnowFingerprint(text)
+
+    def _compare(self, data1: bytes, data2: bytes) -> float:
+        return winnowing.winnowSimilarity(data1, data2)
+
+    def _batchCompare(self, fingerprints: list) -> np.ndarray:
+        return jaccardMatrix([np.unique(winnowing.winnowFromFingerprint(data)[0]) for data in fingerprints])
+
+    def _explain(self, data1: bytes, data2: bytes, text1: str, text2: str) -> list:
+        return [
+            (text1[start1:end1], text2[start2:end2])
+            for start1, end1, start2, end2 in winnowing.matchedPassages(data1, data2)
+        ]
+
+
+class SimHashEngine(Engine):
+    """
+    One simhash per sentence, explains matches as pairs of similar sentences
+    Fingerprints hold every sentence's hash and character span, so matches are explained without tokenizing again
+    """
+    name = "simhash"
+    version = 2
+    field = "simhash"
+    title = "Similar Sentences"
+
+    def _hashes(self, data: bytes) -> list:
+        return [(i + 1, int(h)) for i, h in enumerate(self.decode(data)[0])]
+
+    def _pairs(self, data1: bytes, data2: bytes) -> list:
+        return similarsubstrings.getSimilarSentences(self._hashes(data1), self._hashes(data2))
+
+    def _fingerprint(self, text: str) -> bytes:
+        sentences, starts, ends = similarsubstrings.parseTextSpans(text)
+        return self.encode(0, similarsubstrings.getSentenceHashes(sentences), starts, ends)
+
+    def _compare(self, data1: bytes, data2: bytes) -> float:
+        total = len(self.decode(data1)[0]) + len(self.decode(data2)[0])
+        return 2 * len(self._pairs(data1, data2)) / total if total else 0.0
+
+    def sentence(self, data: bytes, text: str, i: int) -> str:
+        """
+        Return sentence i (numbered from 1) of the text behind a fingerprint, with line breaks and runs of spaces collapsed
+        """
+        _, starts, ends = self.decode(data)
+        return " ".join(text[starts[i - 1]: ends[i - 1]].split())
+
+    def _explain(self, data1: bytes, data2: bytes, text1: str, text2: str) -> list:
+        return [(self.sentence(data1, text1, i), self.sentence(data2, text2, j)) for i, j in self._pairs(data1, data2)]
+
+
+global engines
+engines = {}
+
+
+def registerEngine(engine: Engine) -> Engine:
+    """
+    Add an engine to the registry under its name, replacing any engine of the same name
+    """
+    engines[engine.name] = engine
+    return engine
+
+
+def getEngine(name: str) -> Engine:
+    """
+    Return the registered engine of a name, raise KeyError for unknown engines
+    """
+    return engines[name]
+
+
+def enginesFor(course: dict = None) -> list:
+    """
+    Return the engines a course uses: its own "engines" list if it has one, else the deployment's
+    Unknown names are ignored, so a course keeps working after an engine is removed
+    """
+    names = (course or {}).get("engines") or DEPLOYMENT_ENGINES
+    return [engines[name] for name in names if name in engines]
+
+
+def engineStats() -> dict:
+    """
+    Return the stats of every registered engine
+    """
+    return {name: engine.stats() for name, engine in engines.items()}
+
+
+for _engine in (MinHashEngine(), WinnowingEngine(), SimHashEngine()):
+    registerEngine(_engine)
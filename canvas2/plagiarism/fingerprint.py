@@ -0,0 +1,63 @@
+# flake8: noqa
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+
+# layout: header, one entry per array, then the 8-byte aligned little-endian arrays
+MAGIC = b"C2FP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sB16sHHB")   # magic, format version, engine name, engine version, k, array count
+ARRAY = struct.Struct("<4sQ")          # numpy dtype string, number of items
+
+Fingerprint = namedtuple("Fingerprint", ["engine", "version", "k", "arrays"])
+
+
+def encodeFingerprint(engine: str, version: int, k: int, *arrays) -> bytes:
+    """
+    Return a fingerprint (the arrays an engine derived from a document) packed with the engine name, version and k
+    """
+    arrays = [np.ascontiguousarray(a, dtype=np.dtype(a.dtype).newbyteorder("<")) for a in arrays]
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, engine.encode(), version, k, len(arrays))]
+    parts += [ARRAY.pack(a.dtype.str.encode(), len(a)) for a in arrays]
+
+    offset = HEADER.size + ARRAY.size * len(arrays)
+    for a in arrays:
+        parts.append(b"\0" * (-offset % 8))
+        offset += -offset % 8
+        parts.append(a.tobytes())
+        offset += a.nbytes
+    return b"".join(parts)
+
+
+def decodeFingerprint(data: bytes) -> Fingerprint:
+    """
+    Return the fingerprint packed in data
+    Arrays are read-only views into data through a memoryview, nothing is copied
+    """
+    view = memoryview(data)
+    magic, formatVersion, engine, version, k, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or formatVersion != FORMAT_VERSION:
+        raise ValueError("Not a version %d fingerprint" % FORMAT_VERSION)
+
+    arrays = []
+    offset = HEADER.size + ARRAY.size * count
+    for i in range(count):
+        dtype, length = ARRAY.unpack_from(view, HEADER.size + i * ARRAY.size)
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        offset += -offset % 8
+        arrays.append(np.frombuffer(view, dtype=dtype, count=length, offset=offset))
+        offset += dtype.itemsize * length
+    return Fingerprint(engine.rstrip(b"\0").decode(), version, k, tuple(arrays))
+
+
+def checkFingerprint(fingerprint: Fingerprint, engine: str, version: int) -> Fingerprint:
+    """
+    Return the fingerprint if it was made by the given engine version, raise ValueError otherwise
+    """
+    if fingerprint.engine != engine or fingerprint.version != version:
+        raise ValueError(
+            f"Expected a {engine} v{version} fingerprint, got {fingerprint.engine} v{fingerprint.version}"
+        )
+    return fingerprint
@@ -1,28 +1,50 @@
 # flake8: noqa
-import nltk
+import multiprocessing
+import os
 import re
 import threading
-from collections import deque
-from nltk.stem import WordNetLemmatizer
-from nltk import FreqDist
-from nltk.corpus import brown
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
+import numpy as np
 
-# frequencyList and seen are more effectly used as global variables, kinda ugly but the speedup is worth it
-global frequencyList
-frequencyList = FreqDist(x.lower() for x in brown.words())
-global seen
-seen = dict()
+from .cache import NormalizationCache
+from .lexicon import loadLexicon
+from .minhash import minhashSignatureFromHashes, shingleHash, signatureToFingerprint
+
+
+# the lexicon is memory-mapped, so its pages are shared by every worker process
+# it replaces the brown FreqDist, WordNet lookups and stopword file read at runtime
+global lexicon
+lexicon = loadLexicon()
+
+# bounded cache of word -> normalized word, shared by every request thread
+global normalizationCache
+normalizationCache = NormalizationCache(int(os.environ.get("NORMALIZATION_CACHE_SIZE", 65536)))
+
+# batches of at least PARALLEL_MIN_WORDS words are normalized in CHUNK_WORDS chunks by a process pool
+NORMALIZATION_WORKERS = int(os.environ.get("NORMALIZATION_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_WORDS = int(os.environ.get("NORMALIZATION_PARALLEL_MIN_WORDS", 50000))
+CHUNK_WORDS = 10000
+
+# hashed shingles are seeded polynomial hashes, so they are stable across processes and restarts
+SHINGLE_SEED = 0x2545F4914F6CDD1D
+SHINGLE_PRIME = np.uint64(0x100000001B3)
+global pool
+pool = None
+poolLock = threading.Lock()
+
+# the streaming path reads STREAM_CHUNK_CHARS characters and normalizes STREAM_BATCH_WORDS words at a time
+STREAM_CHUNK_CHARS = 1 << 16
+STREAM_BATCH_WORDS = 4096
 
 
 def parseTextFile(inputFile: str) -> list:
     """
     Parse text file and return a list of words
+    The file is streamed, so only the resulting words are held in memory
     """
-    with open(inputFile, "r") as f:
-        words = f.read().split()
-    return wordCompression(words)
+    return [word for words in streamNormalized(streamWords(readChunks(inputFile), sanitize=False)) for word in words]
 
 
 def parseText(inputText: str) -> list:
@@ -33,38 +55,36 @@ def parseText(inputText: str) -> list:
     return wordCompression(sanitizedInput)
 
 
+def parseTexts(inputTexts: list) -> list:
+    """
+    Parse many plaintexts at once and return a list of words for each
+    """
+    return wordCompressionBatch([re.sub(r"[^\w\s]", "", text).split() for text in inputTexts])
+
+
 def wordSynonym(word: str) -> str:
     """
     Reduce word to its most common synonym
     """
-    if word in seen:
-        return seen[word]
-    else:
-        synonyms = set()
-        for syn in nltk.corpus.wordnet.synsets(word):
-            for l in syn.lemmas():
-                synonyms.add(l.name())
-        stack = deque()
-        for syn in synonyms:
-            if not stack:
-                stack.append((syn, frequencyList[syn]))
-            else:
-                if frequencyList[syn] > stack[-1][1]:
-                    stack.pop()
-                    stack.append((syn, frequencyList[syn]))
-        if stack:
-            seen[word] = stack[0][0]
-            return seen[word]
-        else:
-            seen[word] = word
-            return word
+    return lexicon.synonym(word)
+
+
+def _normalizeWord(word: str) -> str:
+    return wordSynonym(lexicon.lemma(word))
+
+
+def normalizeWord(word: str) -> str:
+    """
+    Lemmatize a word and reduce it to its most common synonym, memoized in normalizationCache
+    """
+    return normalizationCache.get(word, _normalizeWord)
 
 
 def cleanWords(words: list) -> list:
     """
-    Return a list of words that have been reduced to their most common synonym
+    Return a list of words that have been lemmatized and reduced to their most common synonym
     """
-    return [wordSynonym(word) for word in words]
+    return [normalizeWord(word) for word in words]
 
 
 def wordCompression(words: list) -> list:
@@ -76,37 +96,82 @@ def wordCompression(words: list) -> list:
     Resulting words get reduced to their most common synonym (this combats plagiarism by rewording)
     1000 most common words in English source: https://gist.github.com/deekayen/4148741
     """
+    return wordCompressionBatch([words])[0]
 
-    # Create a set from the 1000 most common words in English
-    ignoreThese = set()
 
-    stopwordsPath = Path(__file__).parent.parent / "assets" / "mostCommonWords.txt"
-    with open(stopwordsPath, "r") as f:
-        for line in f:
-            ignoreThese.add(line.strip())
+def wordCompressionBatch(documents: list) -> list:
+    """
+    Run wordCompression over many documents (lists of words) at once
+    Large batches, or very long documents, are normalized in parallel by the process pool
+    """
 
     # Clean input text by removing non-alphanumeric characters and converting to lowercase
-    words = [
-        word.lower()
-        for word in words
-        if word.isalnum() and word.lower() not in ignoreThese
-    ]
-
-    # Lemmatize words (e.g. "dogs" -> "dog")
-    lemmatizer = WordNetLemmatizer()
-    words = [lemmatizer.lemmatize(word) for word in words]
-
-    # Reduce words to their most common synonym using threading to speed up the process
-    temp = words[:]
-    t = threading.Thread(target=cleanWords, args=(temp,))
-    t.start()
-    t.join()
-    words = cleanWords(words)
+    documents = [lowerWords(words) for words in documents]
+
+    # Lemmatize words (e.g. "dogs" -> "dog") and reduce them to their most common synonym
+    documents = cleanWordsBatch(documents)
 
     # Filter out words that are among the 1000 most common words in English once more
-    words = [word for word in words if word.isalnum()
-             and word not in ignoreThese]
-    return words
+    return [dropStopwords(words) for words in documents]
+
+
+def lowerWords(words: list) -> list:
+    """
+    Return the alphanumeric words of a list in lowercase, without the 1000 most common words in English
+    """
+    return [word.lower() for word in words if word.isalnum() and not lexicon.isStopword(word.lower())]
+
+
+def dropStopwords(words: list) -> list:
+    """
+    Return the alphanumeric words of a list, without the 1000 most common words in English
+    """
+    return [word for word in words if word.isalnum() and not lexicon.isStopword(word)]
+
+
+def _warmWorker():
+    """
+    Fault in the lexicon pages and start the cache of a new pool worker
+    """
+    cleanWords(["warm"])
+
+
+def normalizationPool() -> ProcessPoolExecutor:
+    """
+    Return the process pool normalization batches are spread over, starting it on first use
+    Workers are spawned rather than forked, since the web server that owns the pool is multithreaded
+    """
+    global pool
+    with poolLock:
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=NORMALIZATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warmWorker,
+            )
+        return pool
+
+
+def cleanWordsBatch(documents: list) -> list:
+    """
+    Return cleanWords of every document, splitting them into chunks spread over the process pool
+    Batches smaller than PARALLEL_MIN_WORDS stay in-process, where shipping words to a worker would cost more
+    """
+    if NORMALIZATION_WORKERS < 2 or sum(len(words) for words in documents) < PARALLEL_MIN_WORDS:
+        return [cleanWords(words) for words in documents]
+
+    # split every document into chunks, remembering which document each chunk came from
+    chunks, owners = [], []
+    for i, words in enumerate(documents):
+        for j in range(0, len(words), CHUNK_WORDS):
+            chunks.append(words[j: j + CHUNK_WORDS])
+            owners.append(i)
+
+    # map preserves chunk order, so each document is reassembled in order
+    results = [[] for _ in documents]
+    for owner, words in zip(owners, normalizationPool().map(cleanWords, chunks)):
+        results[owner].extend(words)
+    return results
 
 
 def shingles(words: list, k=5) -> set:
@@ -121,6 +186,63 @@ def shingles(words: list, k=5) -> set:
     return shingles
 
 
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """
+    Return the splitmix64 finalizer of an array of uint64 values (a bijection, so no new collisions)
+    Source: https://prng.di.unimi.it/splitmix64.c
+    """
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def hashedShingles(words: list, k=5, seed=SHINGLE_SEED) -> np.ndarray:
+    """
+    Return the shingles of length k as a sorted, deduplicated array of stable 64-bit hashes
+    Unlike hash(), the values do not depend on PYTHONHASHSEED, so they can be stored and compared across processes
+    """
+    words = " ".join(words)
+    codes = np.frombuffer(words.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    # polynomial hash of every window at once, wrapping modulo 2^64
+    h = np.full(n, seed, dtype=np.uint64)
+    for i in range(k):
+        h = h * SHINGLE_PRIME + codes[i: i + n]
+    return np.unique(_mix64(h))
+
+
+def overlapScores(common: int, size1: int, size2: int) -> tuple:
+    """
+    Return the Jaccard similarity and the containment in both directions, |A & B| / |A| and |A & B| / |B|,
+    of two sets of size1 and size2 items sharing common items
+    Containment does not dilute a short text copied whole into a long one, unlike Jaccard
+    """
+    union = size1 + size2 - common
+    return (
+        common / union if union else 0.0,
+        common / size1 if size1 else 0.0,
+        common / size2 if size2 else 0.0,
+    )
+
+
+def hashedSimilarityScore(shingle1: np.ndarray, shingle2: np.ndarray) -> float:
+    """
+    Return the similarity score of two hashed shingle arrays with a vectorized sorted intersection
+    """
+    return hashedOverlapScores(shingle1, shingle2)[0]
+
+
+def hashedOverlapScores(shingle1: np.ndarray, shingle2: np.ndarray) -> tuple:
+    """
+    Return overlapScores of two hashed shingle arrays, from a single sorted intersection
+    """
+    common = len(np.intersect1d(shingle1, shingle2, assume_unique=True))
+    return overlapScores(common, len(shingle1), len(shingle2))
+
+
 def shinglesString(text: str) -> str:
     """
     Return a string representation of a set of shingles
@@ -130,6 +252,107 @@ def shinglesString(text: str) -> str:
     return repr(sh)
 
 
+def shinglesFingerprint(text: str, k=5) -> bytes:
+    """
+    Return the MinHash signature of a text's shingles, packed as a versioned fingerprint
+    Unlike shinglesString, the size of the result does not depend on the length of the text
+    """
+    return streamFingerprint(textChunks(text), k)
+
+
+def readChunks(inputFile: str, chunkSize: int = STREAM_CHUNK_CHARS):
+    """
+    Yield the text of a file chunkSize characters at a time
+    """
+    with open(inputFile, "r") as f:
+        while True:
+            chunk = f.read(chunkSize)
+            if not chunk:
+                return
+            yield chunk
+
+
+def textChunks(text: str, chunkSize: int = STREAM_CHUNK_CHARS):
+    """
+    Yield a text chunkSize characters at a time
+    """
+    for i in range(0, len(text), chunkSize):
+        yield text[i: i + chunkSize]
+
+
+def streamWords(chunks, sanitize=True):
+    """
+    Yield the whitespace-separated words of a stream of text chunks, joining words split across chunks
+    sanitize removes non-alphanumeric characters first, like parseText
+    """
+    carry = ""
+    for chunk in chunks:
+        if sanitize:
+            chunk = re.sub(r"[^\w\s]", "", chunk)
+        words = (carry + chunk).split()
+
+        # the last word may continue in the next chunk
+        carry = words.pop() if words and not (chunk and chunk[-1].isspace()) else ""
+        yield from words
+    if carry:
+        yield carry
+
+
+def streamNormalized(words, batchSize: int = None):
+    """
+    Yield lists of words run through wordCompression, about batchSize words at a time
+    Every word is filtered and normalized on its own, so batching does not change the result
+    Words are read STREAM_BATCH_WORDS at a time, and filtered ones collected until batchSize of them can be normalized
+    at once. By default that is PARALLEL_MIN_WORDS when the process pool is enabled, so long texts are normalized on
+    every core, and STREAM_BATCH_WORDS otherwise
+    """
+    if batchSize is None:
+        batchSize = PARALLEL_MIN_WORDS if NORMALIZATION_WORKERS > 1 else STREAM_BATCH_WORDS
+    words = iter(words)
+    pending = []
+    while True:
+        chunk = list(islice(words, STREAM_BATCH_WORDS))
+        pending.extend(lowerWords(chunk))
+        if pending and (len(pending) >= batchSize or not chunk):
+            normalized = dropStopwords(cleanWordsBatch([pending])[0])
+            pending = []
+            if normalized:
+                yield normalized
+        if not chunk:
+            return
+
+
+def streamShingleHashes(batches, k=5):
+    """
+    Yield arrays of the shingleHash of every shingle of length k, for a stream of lists of normalized words
+    The words are joined exactly as shingles() joins them, but only the last k - 1 characters are carried
+    between batches, so no window is lost or repeated at the seams
+    """
+    tail = None
+    for words in batches:
+        text = " ".join(words) if tail is None else tail + " " + " ".join(words)
+        windows = {text[i: i + k] for i in range(len(text) - k + 1)}
+        yield np.fromiter((shingleHash(w) for w in windows), dtype=np.uint64, count=len(windows))
+        tail = text[len(text) - k + 1:] if k > 1 else ""
+
+
+def wordsFingerprint(words: list, k=5, batchSize: int = STREAM_BATCH_WORDS) -> bytes:
+    """
+    Return shinglesFingerprint of a text from its already normalized words (see parseText)
+    The words are shingled batchSize at a time, so only one batch of shingles is held in memory, as in streamFingerprint
+    """
+    batches = (words[i: i + batchSize] for i in range(0, len(words), batchSize))
+    return signatureToFingerprint(minhashSignatureFromHashes(streamShingleHashes(batches, k)), k)
+
+
+def streamFingerprint(chunks, k=5, sanitize=True) -> bytes:
+    """
+    Return shinglesFingerprint of a stream of text chunks, in memory bounded by the chunk and batch sizes
+    """
+    words = streamNormalized(streamWords(chunks, sanitize))
+    return signatureToFingerprint(minhashSignatureFromHashes(streamShingleHashes(words, k)), k)
+
+
 def similarityScore(shingle1: set, shingle2: set) -> float:
     """
     Return the similarity score of two shingles
@@ -137,10 +360,20 @@ def similarityScore(shingle1: set, shingle2: set) -> float:
     return len(shingle1 & shingle2) / len(shingle1 | shingle2)
 
 
-def compareDocs(doc1: str, doc2: str, k: int) -> float:
+def overlapScore(shingle1: set, shingle2: set) -> tuple:
+    """
+    Return overlapScores of two shingle sets, from a single set intersection
+    """
+    return overlapScores(len(shingle1 & shingle2), len(shingle1), len(shingle2))
+
+
+def compareDocs(doc1: str, doc2: str, k: int, hashed=False) -> float:
     """
     Return the similarity score of two documents
+    hashed selects the integer shingle arrays instead of string sets, the scores are the same
     """
+    if hashed:
+        return hashedSimilarityScore(hashedShingles(parseText(doc1), k), hashedShingles(parseText(doc2), k))
     shingles1 = shingles(parseText(doc1), k)
     shingles2 = shingles(parseText(doc2), k)
     return similarityScore(shingles1, shingles2)
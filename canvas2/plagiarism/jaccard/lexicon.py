@@ -0,0 +1,252 @@
+# flake8: noqa
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+# compiled lexicon, built from the NLTK corpora by buildLexicon()
+ASSETS_PATH = Path(__file__).parent.parent / "assets"
+STOPWORDS_PATH = ASSETS_PATH / "mostCommonWords.txt"
+LEXICON_PATH = ASSETS_PATH / "lexicon.bin"
+
+# file layout: header, section table, then 8-byte aligned little-endian arrays
+MAGIC = b"C2LX"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+SECTION = struct.Struct("<16s4sQQ")
+
+SECTIONS = (
+    "stopwords",        # sorted key hashes of the stopwords
+    "freq_keys",        # sorted key hashes of brown corpus words
+    "freq_values",      # their brown corpus frequencies
+    "lemma_keys",       # sorted key hashes of words whose lemma differs from the word
+    "lemma_values",     # string ids of their lemmas
+    "synonym_keys",     # sorted key hashes of words whose synonym differs from the word
+    "synonym_values",   # string ids of their most common synonyms
+    "string_offsets",   # start offset of each string in string_data, plus the end
+    "string_data",      # utf8 bytes of every lemma and synonym
+)
+
+
+def wordKey(word: str) -> int:
+    """
+    Return the 64-bit key a word is stored under in the lexicon
+    """
+    return int.from_bytes(hashlib.blake2b(word.encode("utf8"), digest_size=8).digest(), "little")
+
+
+def wordKeys(words: list) -> np.ndarray:
+    """
+    Return the 64-bit keys of many words as a uint64 array
+    """
+    return np.fromiter((wordKey(w) for w in words), dtype=np.uint64, count=len(words))
+
+
+class Lexicon:
+    """
+    Read-only view over a compiled lexicon file
+    The file is memory-mapped, so every worker process shares the same pages
+    """
+
+    def __init__(self, path: Path = LEXICON_PATH):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} lexicon, rebuild it")
+
+        self._sections = dict()
+        for i in range(count):
+            name, dtype, offset, length = SECTION.unpack_from(self._mmap, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            self._sections[name] = np.frombuffer(self._mmap, dtype=dtype.rstrip(b"\0").decode(), count=length, offset=offset)
+
+    def _string(self, i: int) -> str:
+        offsets = self._sections["string_offsets"]
+        return bytes(self._sections["string_data"][offsets[i]: offsets[i + 1]]).decode("utf8")
+
+    def _find(self, name: str, key: int) -> int:
+        """
+        Return the position of a key in a sorted key section, or -1 if absent
+        """
+        keys = self._sections[name]
+        i = int(np.searchsorted(keys, np.uint64(key)))
+        if i < len(keys) and keys[i] == key:
+            return i
+        return -1
+
+    def _lookup(self, name: str, word: str) -> str:
+        i = self._find(name + "_keys", wordKey(word))
+        if i < 0:
+            return word
+        return self._string(int(self._sections[name + "_values"][i]))
+
+    def _lookupMany(self, name: str, words: list) -> list:
+        keys, values = self._sections[name + "_keys"], self._sections[name + "_values"]
+        if not words or not len(keys):
+            return list(words)
+        query = wordKeys(words)
+        idx = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        found = keys[idx] == query
+        return [self._string(int(values[i])) if hit else w for w, i, hit in zip(words, idx, found)]
+
+    def isStopword(self, word: str) -> bool:
+        """
+        Return whether a word is one of the 1000 most common words in English
+        """
+        return self._find("stopwords", wordKey(word)) >= 0
+
+    def frequency(self, word: str) -> int:
+        """
+        Return the number of times a word occurs in the brown corpus
+        """
+        i = self._find("freq_keys", wordKey(word))
+        return int(self._sections["freq_values"][i]) if i >= 0 else 0
+
+    def lemma(self, word: str) -> str:
+        """
+        Return the base form of a word (e.g. "dogs" -> "dog")
+        """
+        return self._lookup("lemma", word)
+
+    def synonym(self, word: str) -> str:
+        """
+        Return the most common synonym of a word
+        """
+        return self._lookup("synonym", word)
+
+    def lemmas(self, words: list) -> list:
+        """
+        Return the base forms of many words with one vectorized probe
+        """
+        return self._lookupMany("lemma", words)
+
+    def synonyms(self, words: list) -> list:
+        """
+        Return the most common synonyms of many words with one vectorized probe
+        """
+        return self._lookupMany("synonym", words)
+
+
+def resolveSynonym(word: str, wordnet, frequencies) -> str:
+    """
+    Return the synonym of a word that is most frequent in the brown corpus
+    Ties go to the alphabetically first synonym, so builds are reproducible
+    """
+    synonyms = sorted({l.name() for syn in wordnet.synsets(word) for l in syn.lemmas()})
+    if not synonyms:
+        return word
+    return max(synonyms, key=lambda s: frequencies[s])
+
+
+def writeLexicon(outputPath: Path, stopwords: set, frequencies: dict, lemmas: dict, synonyms: dict) -> Path:
+    """
+    Write already resolved normalization tables to a lexicon file
+    """
+    # intern every lemma and synonym into one string table
+    strings = sorted(set(lemmas.values()) | set(synonyms.values()))
+    stringIds = {s: i for i, s in enumerate(strings)}
+    encoded = [s.encode("utf8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(s) for s in encoded])
+
+    def table(mapping: dict, values) -> tuple:
+        words = list(mapping)
+        keys = wordKeys(words)
+        order = np.argsort(keys)
+        vals = np.fromiter((values(mapping[w]) for w in words), dtype="<u4", count=len(words))
+        return keys[order].astype("<u8"), vals[order]
+
+    freqKeys, freqValues = table({w: c for w, c in frequencies.items() if w.isalnum()}, int)
+    lemmaKeys, lemmaValues = table(lemmas, stringIds.get)
+    synonymKeys, synonymValues = table(synonyms, stringIds.get)
+    arrays = {
+        "stopwords": np.sort(wordKeys(sorted(stopwords))).astype("<u8"),
+        "freq_keys": freqKeys,
+        "freq_values": freqValues,
+        "lemma_keys": lemmaKeys,
+        "lemma_values": lemmaValues,
+        "synonym_keys": synonymKeys,
+        "synonym_values": synonymValues,
+        "string_offsets": offsets,
+        "string_data": np.frombuffer(b"".join(encoded), dtype="|u1"),
+    }
+
+    # write to a temporary file first so concurrent readers never see a partial lexicon
+    outputPath = Path(outputPath)
+    fd, tmpPath = tempfile.mkstemp(dir=outputPath.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        offset = HEADER.size + SECTION.size * len(SECTIONS)
+        header = [HEADER.pack(MAGIC, VERSION, len(SECTIONS))]
+        for name in SECTIONS:
+            offset += -offset % 8
+            array = arrays[name]
+            header.append(SECTION.pack(name.encode(), array.dtype.str.encode(), offset, len(array)))
+            offset += array.nbytes
+        f.write(b"".join(header))
+        for name in SECTIONS:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(arrays[name].tobytes())
+    os.replace(tmpPath, outputPath)
+    return outputPath
+
+
+def buildLexicon(outputPath: Path = LEXICON_PATH) -> Path:
+    """
+    Compile the stopwords, brown frequencies and resolved lemma and synonym tables into one file
+    This is the only place the NLTK corpora are read, normalization afterwards only uses the file
+    """
+    # NLTK is imported here so processes that only read the lexicon never load it
+    from nltk import FreqDist
+    from nltk.corpus import brown, wordnet
+    from nltk.stem import WordNetLemmatizer
+
+    with open(STOPWORDS_PATH, "r") as f:
+        stopwords = {line.strip() for line in f if line.strip()}
+
+    frequencies = FreqDist(x.lower() for x in brown.words())
+    lemmatizer = WordNetLemmatizer()
+
+    # every word normalization can realistically see: brown words, wordnet lemmas and their plurals
+    nouns = set(wordnet.all_lemma_names(pos="n"))
+    vocabulary = {w for w in frequencies if w.isalnum()}
+    vocabulary.update(w for w in wordnet.all_lemma_names() if w.isalnum())
+    for noun in nouns:
+        for old, new in wordnet.MORPHOLOGICAL_SUBSTITUTIONS[wordnet.NOUN]:
+            if noun.isalnum() and noun.endswith(new):
+                vocabulary.add(noun[: len(noun) - len(new)] + old)
+
+    lemmas = dict()
+    for word in vocabulary:
+        lemma = lemmatizer.lemmatize(word)
+        if lemma != word:
+            lemmas[word] = lemma
+
+    synonyms = dict()
+    for word in vocabulary | set(lemmas.values()):
+        synonym = resolveSynonym(word, wordnet, frequencies)
+        if synonym != word:
+            synonyms[word] = synonym
+
+    return writeLexicon(outputPath, stopwords, frequencies, lemmas, synonyms)
+
+
+def loadLexicon(path: Path = LEXICON_PATH) -> Lexicon:
+    """
+    Return the compiled lexicon, building it first if this install has not done so yet
+    """
+    if not Path(path).exists():
+        print(f"Lexicon not found at {path}, building it from the NLTK corpora...", file=sys.stderr)
+        buildLexicon(path)
+    return Lexicon(path)
+
+
+if __name__ == "__main__":
+    print(f"Wrote {buildLexicon()}")
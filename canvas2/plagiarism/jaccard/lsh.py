@@ -0,0 +1,72 @@
+# flake8: noqa
+import hashlib
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from .minhash import NUM_PERM
+
+
+# number of points used when integrating the banding probability curve
+INTEGRATION_STEPS = 1000
+
+
+def _collisionProbability(s: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Return the probability that two documents with Jaccard similarity s share at least one band
+    """
+    return 1.0 - (1.0 - s ** rows) ** bands
+
+
+def _integrate(bands: int, rows: int, lower: float, upper: float, falseNegative: bool) -> float:
+    """
+    Return the area under (or above, for false negatives) the collision curve between lower and upper
+    """
+    s = np.linspace(lower, upper, INTEGRATION_STEPS)
+    p = _collisionProbability(s, bands, rows)
+    if falseNegative:
+        p = 1.0 - p
+    return float(p.mean() * (upper - lower))
+
+
+@lru_cache(maxsize=32)
+def optimalParams(threshold: float, numPerm: int = NUM_PERM) -> tuple:
+    """
+    Return the (bands, rows) split of a signature that best separates pairs around a Jaccard threshold
+    Both kinds of error are weighted equally, i.e. this minimizes false positive + false negative area
+    Source: http://infolab.stanford.edu/~ullman/mmds/ch3.pdf (section 3.4)
+    """
+    if not 0.0 < threshold < 1.0:
+        raise ValueError("Threshold must be between 0 and 1")
+
+    best, bestError = (1, numPerm), float("inf")
+    for bands in range(1, numPerm + 1):
+        for rows in range(1, numPerm // bands + 1):
+            error = _integrate(bands, rows, 0.0, threshold, False) \
+                + _integrate(bands, rows, threshold, 1.0, True)
+            if error < bestError:
+                best, bestError = (bands, rows), error
+    return best
+
+
+def bandKeys(signature: np.ndarray, bands: int, rows: int) -> list:
+    """
+    Return one 8-byte bucket key per band of a signature
+    Two signatures land in the same bucket of a band only if every row of that band is equal
+    """
+    return [
+        hashlib.blake2b(signature[i * rows: (i + 1) * rows].tobytes(), digest_size=8).digest()
+        for i in range(bands)
+    ]
+
+
+def candidatePairs(buckets) -> set:
+    """
+    Return every unordered pair of ids that share at least one bucket
+    Each bucket is an iterable of ids; pairs are sorted tuples so each appears once
+    """
+    pairs = set()
+    for bucket in buckets:
+        pairs.update(combinations(sorted(set(bucket)), 2))
+    return pairs
@@ -0,0 +1,76 @@
+# flake8: noqa
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .minhash import isEmptySignature
+
+
+def featureMatrix(featureArrays: list) -> csr_matrix:
+    """
+    Return a sparse binary document x feature matrix, one row per array of feature hashes
+    Features are relabelled to column ids, so any uint64 hashes can be used
+    """
+    lengths = np.fromiter((len(a) for a in featureArrays), dtype=np.int64, count=len(featureArrays))
+    features = np.concatenate(featureArrays) if len(featureArrays) else np.empty(0, dtype=np.uint64)
+    columns, inverse = np.unique(features, return_inverse=True)
+    rows = np.repeat(np.arange(len(featureArrays)), lengths)
+
+    matrix = csr_matrix(
+        (np.ones(len(features), dtype=np.int32), (rows, inverse.ravel())),
+        shape=(len(featureArrays), len(columns)),
+    )
+    # a repeated feature in one document must still count once
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def intersectionMatrix(featureArrays: list) -> np.ndarray:
+    """
+    Return the N x N matrix of shared feature counts with one sparse matrix product
+    """
+    matrix = featureMatrix(featureArrays)
+    return (matrix @ matrix.T).toarray()
+
+
+def jaccardMatrix(shingleArrays: list) -> np.ndarray:
+    """
+    Return the N x N exact Jaccard matrix of hashed shingle arrays (see hashedShingles)
+    Pairs involving an empty document score 0
+    """
+    common = intersectionMatrix(shingleArrays).astype(np.float64)
+    sizes = np.diag(common)
+    union = sizes[:, np.newaxis] + sizes[np.newaxis, :] - common
+    return np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+
+
+def signatureMatrix(signatures: list) -> np.ndarray:
+    """
+    Return the N x N estimated Jaccard matrix of MinHash signatures
+    Each (permutation, value) pair is one feature, so the product counts agreeing permutations
+    """
+    if not len(signatures):
+        return np.zeros((0, 0))
+    numPerm = len(signatures[0])
+    if any(len(s) != numPerm for s in signatures):
+        raise ValueError("Signatures must have the same number of permutations")
+
+    offsets = np.arange(numPerm, dtype=np.uint64) << np.uint64(32)
+    features = [np.asarray(s, dtype=np.uint64) | offsets for s in signatures]
+    matrix = intersectionMatrix(features) / numPerm
+
+    # empty documents all share the same signature, but are not similar to anything
+    empty = np.array([isEmptySignature(s) for s in signatures])
+    matrix[empty, :] = 0.0
+    matrix[:, empty] = 0.0
+    return matrix
+
+
+def mostSimilar(matrix: np.ndarray) -> tuple:
+    """
+    Return, for every document, the index of its most similar other document and that score
+    """
+    scores = matrix.astype(np.float64, copy=True)
+    np.fill_diagonal(scores, -1.0)
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(best)), best]
@@ -0,0 +1,143 @@
+# flake8: noqa
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from ..fingerprint import encodeFingerprint, decodeFingerprint, checkFingerprint
+
+
+# stored with every fingerprint, bump VERSION whenever signatures stop being comparable
+ENGINE = "minhash"
+VERSION = 1
+
+# length of a signature, i.e. the number of hash permutations applied
+NUM_PERM = 128
+SEED = 1
+
+# permutations come from the universal hash family (a * x + b) % p, where p is
+# the mersenne prime 2^61 - 1 and x is a 32-bit hash of a shingle
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# number of shingles permuted at once, keeps the (chunk x numPerm) matrix small
+CHUNK_SIZE = 4096
+
+
+@lru_cache(maxsize=8)
+def permutations(numPerm: int = NUM_PERM, seed: int = SEED) -> tuple:
+    """
+    Return the (a, b) coefficient arrays of numPerm hash permutations
+    The generator is seeded so signatures stay comparable across processes and restarts
+    """
+    gen = np.random.RandomState(seed)
+    a = gen.randint(1, MERSENNE_PRIME, size=numPerm, dtype=np.uint64)
+    b = gen.randint(0, MERSENNE_PRIME, size=numPerm, dtype=np.uint64)
+    return a, b
+
+
+def shingleHash(shingle: str) -> int:
+    """
+    Return a stable 32-bit hash of a shingle (unlike hash(), not salted per process)
+    """
+    return zlib.crc32(shingle.encode("utf8"))
+
+
+def minhashSignature(shingles: set, numPerm: int = NUM_PERM, seed: int = SEED) -> np.ndarray:
+    """
+    Return the MinHash signature of a set of shingles as an array of numPerm uint64 values
+    Source: https://en.wikipedia.org/wiki/MinHash (variant with many hash functions)
+    """
+    hashes = np.fromiter((shingleHash(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return minhashSignatureFromHashes([hashes], numPerm, seed)
+
+
+def minhashSignatureFromHashes(hashBatches, numPerm: int = NUM_PERM, seed: int = SEED) -> np.ndarray:
+    """
+    Return the MinHash signature of a stream of arrays of shingle hashes (see shingleHash)
+    Only one batch is held at a time, and repeated hashes do not change the signature
+    """
+    signature = np.full(numPerm, MAX_HASH, dtype=np.uint64)
+    a, b = permutations(numPerm, seed)
+
+    # uint64 products wrap around, which is fine for hashing purposes
+    for hashes in hashBatches:
+        for i in range(0, len(hashes), CHUNK_SIZE):
+            chunk = hashes[i: i + CHUNK_SIZE, np.newaxis]
+            permuted = ((chunk * a + b) % MERSENNE_PRIME) & MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+
+def isEmptySignature(signature: np.ndarray) -> bool:
+    """
+    Return whether a signature was built from an empty set of shingles
+    """
+    return bool(np.all(signature == MAX_HASH))
+
+
+def estimateSimilarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """
+    Return the estimated Jaccard similarity of the shingle sets behind two signatures
+    """
+    if len(signature1) != len(signature2):
+        raise ValueError("Signatures must have the same number of permutations")
+    if isEmptySignature(signature1) or isEmptySignature(signature2):
+        return 0.0
+    return np.count_nonzero(signature1 == signature2) / len(signature1)
+
+
+def estimateCardinality(signature: np.ndarray) -> float:
+    """
+    Return the estimated number of distinct shingles behind a signature
+    Every permutation maps shingles to roughly uniform values, so the minimum of n of them is about MAX_HASH / (n + 1)
+    Source: https://doi.org/10.1145/1281100.1281133 (Cohen and Kaplan, bottom-k sketches, estimator (k - 1) / sum)
+    """
+    if isEmptySignature(signature):
+        return 0.0
+    u = (np.asarray(signature, dtype=np.float64) + 1.0) / (float(MAX_HASH) + 2.0)
+    return float((len(signature) - 1) / -np.log1p(-u).sum())
+
+
+def estimateScores(signature1: np.ndarray, signature2: np.ndarray) -> tuple:
+    """
+    Return the estimated Jaccard similarity and containment in both directions, |A & B| / |A| and |A & B| / |B|,
+    of the shingle sets behind two signatures
+    The intersection comes from the same count of agreeing permutations as the Jaccard estimate,
+    scaled by the estimated set sizes: |A & B| = J / (1 + J) * (|A| + |B|)
+    """
+    jaccard = float(estimateSimilarity(signature1, signature2))
+    if not jaccard:
+        return 0.0, 0.0, 0.0
+    size1, size2 = estimateCardinality(signature1), estimateCardinality(signature2)
+    common = jaccard / (1 + jaccard) * (size1 + size2)
+    return jaccard, min(1.0, common / size1), min(1.0, common / size2)
+
+
+def signatureToBytes(signature: np.ndarray) -> bytes:
+    """
+    Return a signature packed as little-endian uint64 bytes, stored by pymongo as BSON binary
+    """
+    return signature.astype("<u8", copy=False).tobytes()
+
+
+def signatureFromBytes(data: bytes) -> np.ndarray:
+    """
+    Return the signature stored in a bytes object (read-only view, no copy)
+    """
+    return np.frombuffer(data, dtype="<u8")
+
+
+def signatureToFingerprint(signature: np.ndarray, k: int) -> bytes:
+    """
+    Return a signature of k-shingles packed as a versioned fingerprint
+    """
+    return encodeFingerprint(ENGINE, VERSION, k, signature.astype(np.uint64, copy=False))
+
+
+def signatureFromFingerprint(data: bytes) -> np.ndarray:
+    """
+    Return the signature stored in a fingerprint (read-only view, no copy)
+    Raises ValueError if the fingerprint was made by another engine or version
+    """
+    return checkFingerprint(decodeFingerprint(data), ENGINE, VERSION).arrays[0]
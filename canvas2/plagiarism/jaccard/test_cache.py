@@ -0,0 +1,36 @@
+# flake8: noqa
+from concurrent.futures import ThreadPoolExecutor
+
+from canvas2.plagiarism.jaccard.cache import NormalizationCache
+
+
+def test_eviction():
+    '''
+    Test that the cache stays within its size limit and evicts the least recently used entry
+    '''
+    cache = NormalizationCache(2)
+    cache.get("dogs", str.upper)
+    cache.get("cats", str.upper)
+    cache.get("dogs", str.upper)
+    cache.get("geese", str.upper)
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    assert cache.get("dogs", str.lower) == "DOGS"
+    assert cache.get("cats", str.lower) == "cats"
+
+
+def test_threads():
+    '''
+    Test that concurrent lookups keep the cache bounded and the counters consistent
+    '''
+    cache = NormalizationCache(50)
+    words = [f"word{i % 200}" for i in range(20000)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda w: cache.get(w, str.upper), words))
+
+    stats = cache.stats()
+    assert results == [w.upper() for w in words]
+    assert stats["size"] <= 50
+    assert stats["hits"] + stats["misses"] == len(words)
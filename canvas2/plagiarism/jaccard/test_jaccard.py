@@ -1,6 +1,11 @@
 # flake8: noqa
-from jaccardsimilarity import parseTextFile, shingles, similarityScore,\
-    shinglesString
+from canvas2.plagiarism.jaccard import jaccardsimilarity
+from canvas2.plagiarism.jaccard.jaccardsimilarity import parseTextFile, shingles, similarityScore,\
+    shinglesString, parseText, parseTexts, hashedShingles, hashedSimilarityScore, wordCompression,\
+    overlapScore, hashedOverlapScores,\
+    streamFingerprint, streamWords, streamNormalized, streamShingleHashes, textChunks, readChunks,\
+    wordsFingerprint, STREAM_BATCH_WORDS
+from canvas2.plagiarism.jaccard.minhash import minhashSignature, minhashSignatureFromHashes, signatureToFingerprint
 from pathlib import Path
 
 
@@ -76,3 +81,110 @@ def test_set_3():
     '''
     print(shinglesString(
         "This is a submission for the course \n COP4521 - Secure, \n Parallel and Distributed Computing with Python"))
+
+
+def test_batch():
+    '''
+    Test that normalizing documents over the process pool gives the same words as one at a time
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    texts = [Path(testDirPath, name).read_text() for name in ("original1.txt", "t1.txt", "s5.txt")]
+
+    minWords = jaccardsimilarity.PARALLEL_MIN_WORDS
+    jaccardsimilarity.PARALLEL_MIN_WORDS = 0
+    try:
+        assert parseTexts(texts) == [parseText(text) for text in texts]
+    finally:
+        jaccardsimilarity.PARALLEL_MIN_WORDS = minWords
+
+
+def test_stream_parallel():
+    '''
+    Test that streamed texts are normalized in batches large enough for the process pool, with the same result
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    text = " ".join(Path(testDirPath, name).read_text() for name in ("original1.txt", "t1.txt", "s5.txt") * 8)
+    expected = wordCompression(text.split())
+
+    sizes = []
+    cleanWordsBatch = jaccardsimilarity.cleanWordsBatch
+    def recordingBatch(documents):
+        sizes.append(sum(len(words) for words in documents))
+        return cleanWordsBatch(documents)
+
+    settings = jaccardsimilarity.NORMALIZATION_WORKERS, jaccardsimilarity.PARALLEL_MIN_WORDS
+    jaccardsimilarity.NORMALIZATION_WORKERS, jaccardsimilarity.PARALLEL_MIN_WORDS = 2, 2000
+    jaccardsimilarity.cleanWordsBatch = recordingBatch
+    try:
+        words = streamWords(textChunks(text, 64), sanitize=False)
+        assert [word for batch in streamNormalized(words) for word in batch] == expected
+    finally:
+        jaccardsimilarity.NORMALIZATION_WORKERS, jaccardsimilarity.PARALLEL_MIN_WORDS = settings
+        jaccardsimilarity.cleanWordsBatch = cleanWordsBatch
+
+    # every batch but the last reaches the pool, though a single read of STREAM_BATCH_WORDS words does not
+    assert len(sizes) > 1
+    assert all(size >= 2000 for size in sizes[:-1])
+
+
+def test_hashed():
+    '''
+    Test that hashed shingle arrays give the same scores as the string sets they replace
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    original = parseTextFile(Path(testDirPath, "original1.txt"))
+
+    for name in ("t1.txt", "t2.txt", "t3.txt", "t4.txt", "t5.txt"):
+        test = parseTextFile(Path(testDirPath, name))
+        expected = similarityScore(shingles(original), shingles(test))
+        assert hashedSimilarityScore(hashedShingles(original), hashedShingles(test)) == expected
+        assert len(hashedShingles(test)) == len(shingles(test))
+
+        # one intersection gives jaccard and both containments, the same for sets and hashes
+        scores = overlapScore(shingles(original), shingles(test))
+        assert scores == hashedOverlapScores(hashedShingles(original), hashedShingles(test))
+        assert scores[0] == expected
+        assert scores[1] == len(shingles(original) & shingles(test)) / len(shingles(original))
+
+
+def test_stream():
+    '''
+    Test that streaming in small pieces gives the same words and fingerprints as parsing the whole text at once
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    for name in ("original1.txt", "t3.txt", "s5.txt"):
+        path = Path(testDirPath, name)
+        text = path.read_text()
+
+        # parseTextFile used to read the whole file and split it
+        assert parseTextFile(path) == wordCompression(text.split())
+
+        expected = minhashSignature(shingles(parseText(text), 5))
+        for chunkSize in (1, 7, 4096):
+            for batchSize in (1, 3, 4096):
+                words = streamNormalized(streamWords(textChunks(text, chunkSize)), batchSize)
+                assert (minhashSignatureFromHashes(streamShingleHashes(words, 5)) == expected).all()
+        assert streamFingerprint(readChunks(path, 13), 5) == signatureToFingerprint(expected, 5)
+
+    # shorter than a single shingle
+    assert streamFingerprint(iter(["a b"]), 5) == signatureToFingerprint(minhashSignature(set()), 5)
+    assert wordsFingerprint([], 5) == signatureToFingerprint(minhashSignature(set()), 5)
+
+
+def test_words_stream():
+    '''
+    Test that fingerprints made from normalized words match streamed ones, however the words are batched
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    texts = [Path(testDirPath, name).read_text() for name in ("original1.txt", "t3.txt", "s5.txt")]
+
+    # longer than a single batch of STREAM_BATCH_WORDS words
+    texts.append(" ".join(texts * 40))
+    assert len(parseText(texts[-1])) > STREAM_BATCH_WORDS
+
+    for text in texts:
+        words = parseText(text)
+        expected = streamFingerprint(textChunks(text), 5)
+        assert wordsFingerprint(words, 5) == expected
+        for batchSize in (1, 3, 100):
+            assert wordsFingerprint(words, 5, batchSize) == expected
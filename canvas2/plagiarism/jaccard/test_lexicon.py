@@ -0,0 +1,23 @@
+# flake8: noqa
+from canvas2.plagiarism.jaccard.lexicon import Lexicon, writeLexicon
+
+
+def test_lookups(tmp_path):
+    '''
+    Test that a written lexicon reads back the same normalization tables through the memory map
+    '''
+    path = writeLexicon(
+        tmp_path / "lexicon.bin",
+        stopwords={"the", "of", "and"},
+        frequencies={"dog": 75, "cat": 23, "hound": 4},
+        lemmas={"dogs": "dog", "hounds": "hound", "geese": "goose"},
+        synonyms={"hound": "dog", "canine": "dog", "feline": "cat"},
+    )
+    lexicon = Lexicon(path)
+
+    assert lexicon.isStopword("the") and not lexicon.isStopword("dog")
+    assert lexicon.frequency("dog") == 75 and lexicon.frequency("wolf") == 0
+    assert lexicon.lemma("geese") == "goose" and lexicon.lemma("goose") == "goose"
+    assert lexicon.synonym("hound") == "dog" and lexicon.synonym("wolf") == "wolf"
+    assert lexicon.lemmas(["dogs", "wolves", "hounds"]) == ["dog", "wolves", "hound"]
+    assert lexicon.synonyms(lexicon.lemmas(["hounds", "feline", "cats"])) == ["dog", "cat", "cats"]
@@ -0,0 +1,24 @@
+# flake8: noqa
+from canvas2.plagiarism.jaccard.jaccardsimilarity import shingles
+from canvas2.plagiarism.jaccard.lsh import optimalParams, bandKeys, candidatePairs
+from canvas2.plagiarism.jaccard.minhash import NUM_PERM, minhashSignature
+
+
+def test_candidates():
+    '''
+    Test that near-duplicates share a bucket while unrelated documents do not
+    '''
+    docs = {
+        "original": "four score and seven years ago our fathers brought forth on this continent a new nation",
+        "copy": "four score and seven years ago our fathers brought forth on this continent a new country",
+        "unrelated": "it was the best of times, it was the worst of times, it was the age of wisdom",
+    }
+    bands, rows = optimalParams(0.5)
+    assert bands * rows <= NUM_PERM
+
+    buckets = {}
+    for name, text in docs.items():
+        for band, key in enumerate(bandKeys(minhashSignature(shingles([text])), bands, rows)):
+            buckets.setdefault((band, key), []).append(name)
+
+    assert candidatePairs(buckets.values()) == {("copy", "original")}
@@ -0,0 +1,44 @@
+# flake8: noqa
+import numpy as np
+
+from canvas2.plagiarism.jaccard.jaccardsimilarity import shingles
+from canvas2.plagiarism.jaccard.matrix import jaccardMatrix, signatureMatrix, mostSimilar
+from canvas2.plagiarism.jaccard.minhash import minhashSignature, estimateSimilarity
+
+
+DOCS = [
+    "four score and seven years ago our fathers brought forth on this continent a new nation",
+    "four score and seven years ago our fathers brought forth upon this continent a new country",
+    "it was the best of times, it was the worst of times, it was the age of wisdom",
+    "",
+]
+
+
+def test_jaccard():
+    '''
+    Test that the sparse product gives the same matrix as comparing every pair of sets
+    '''
+    sets = [shingles([d]) for d in DOCS]
+    arrays = [np.array(sorted(hash(s) & 0xFFFFFFFFFFFF for s in sh), dtype=np.uint64) for sh in sets]
+    matrix = jaccardMatrix(arrays)
+
+    for i, a in enumerate(sets):
+        for j, b in enumerate(sets):
+            expected = len(a & b) / len(a | b) if a | b else 0.0
+            assert abs(matrix[i, j] - expected) < 1e-12
+
+    best, scores = mostSimilar(matrix)
+    assert best[0] == 1 and best[1] == 0 and scores[0] == matrix[0, 1]
+
+
+def test_signatures():
+    '''
+    Test that the signature matrix matches the pairwise estimator
+    '''
+    signatures = [minhashSignature(shingles([d])) for d in DOCS]
+    matrix = signatureMatrix(signatures)
+
+    for i, a in enumerate(signatures):
+        for j, b in enumerate(signatures):
+            if i != j:
+                assert matrix[i, j] == estimateSimilarity(a, b)
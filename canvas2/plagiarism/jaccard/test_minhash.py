@@ -0,0 +1,45 @@
+# flake8: noqa
+from canvas2.plagiarism.jaccard.jaccardsimilarity import shingles
+from canvas2.plagiarism.jaccard.minhash import NUM_PERM, minhashSignature, \
+    estimateSimilarity, estimateCardinality, estimateScores, signatureToBytes, signatureFromBytes
+
+
+def test_estimate():
+    '''
+    Test that the signature estimate tracks the exact Jaccard similarity of the shingle sets
+    '''
+    a = shingles(["the quick brown fox jumps over the lazy dog " * 3 + "and runs away from the farmer"])
+    b = shingles(["the quick brown fox jumps over the lazy dog " * 3 + "and hides behind the old barn"])
+    exact = len(a & b) / len(a | b)
+
+    estimate = estimateSimilarity(minhashSignature(a), minhashSignature(b))
+    assert abs(estimate - exact) < 0.15
+    assert estimateSimilarity(minhashSignature(a), minhashSignature(a)) == 1.0
+    assert estimateSimilarity(minhashSignature(a), minhashSignature(set())) == 0.0
+
+
+def test_roundtrip():
+    '''
+    Test that the stored size is constant and that signatures survive packing
+    '''
+    short = minhashSignature(shingles(["a short essay"]))
+    long = minhashSignature(shingles(["a much, much longer essay " * 500]))
+
+    assert len(signatureToBytes(short)) == len(signatureToBytes(long)) == NUM_PERM * 8
+    assert (signatureFromBytes(signatureToBytes(long)) == long).all()
+
+
+def test_containment():
+    '''
+    Test that containment estimates are not diluted by the length of the text a short one was copied into
+    '''
+    short = shingles(["four score and seven years ago our fathers brought forth on this continent a new nation"])
+    long = shingles([" ".join("filler sentence number %d of a much longer essay" % i for i in range(20))
+                         + " four score and seven years ago our fathers brought forth on this continent a new nation"])
+    assert abs(estimateCardinality(minhashSignature(long)) - len(long)) < 0.3 * len(long)
+
+    jaccard, contained, covered = estimateScores(minhashSignature(short), minhashSignature(long))
+    assert jaccard == estimateSimilarity(minhashSignature(short), minhashSignature(long))
+    assert contained > 0.6 > jaccard
+    assert abs(covered - len(short & long) / len(long)) < 0.15
+    assert estimateScores(minhashSignature(short), minhashSignature(set())) == (0.0, 0.0, 0.0)
@@ -0,0 +1,56 @@
+# flake8: noqa
+import numpy as np
+
+
+# posting lists are sorted ids stored as the gaps between them, each gap as a LEB128 varint
+# gaps between the ids of one hash are small, so most take a single byte instead of eight
+MAX_VARINT_BYTES = 10
+
+
+def encodePostings(ids: np.ndarray) -> bytes:
+    """
+    Return a posting list (any ids, duplicates are dropped) delta-encoded as varint bytes
+    """
+    ids = np.unique(np.asarray(ids, dtype=np.uint64))
+    if not len(ids):
+        return b""
+    gaps = np.diff(ids, prepend=np.uint64(0))
+
+    # number of 7-bit groups each gap needs, at least one
+    lengths = np.ones(len(gaps), dtype=np.int64)
+    for i in range(1, MAX_VARINT_BYTES):
+        lengths += gaps >= (np.uint64(1) << np.uint64(7 * i))
+
+    # byte j of a gap holds bits 7j..7j+6, with the high bit set on every byte but its last
+    ends = np.cumsum(lengths)
+    out = np.zeros(ends[-1], dtype=np.uint8)
+    starts = ends - lengths
+    for j in range(lengths.max()):
+        mask = lengths > j
+        group = (gaps[mask] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        more = (lengths[mask] > j + 1).astype(np.uint8) << 7
+        out[starts[mask] + j] = group.astype(np.uint8) | more
+    return out.tobytes()
+
+
+def decodePostings(data: bytes) -> np.ndarray:
+    """
+    Return the sorted uint64 ids of a posting list made by encodePostings
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.uint64)
+
+    # a varint ends at every byte without its high bit set
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    groups = (raw & 0x7F).astype(np.uint64) << (np.uint64(7) * shifts.astype(np.uint64))
+    return np.cumsum(np.add.reduceat(groups, starts), dtype=np.uint64)
+
+
+def mergePostings(data: bytes, ids: np.ndarray) -> bytes:
+    """
+    Return a posting list with more ids added to it
+    """
+    return encodePostings(np.concatenate((decodePostings(data), np.asarray(ids, dtype=np.uint64))))
@@ -1,7 +1,12 @@
 # flake8: noqa
-from collections import Counter
-from nltk import tokenize
+from collections import Counter, defaultdict
+from itertools import combinations
+from math import comb
 import numpy as np
+from scipy.sparse import csr_matrix
+
+# imported absolutely, since test_simhash imports this module on its own
+from canvas2.plagiarism.simhash.tokenizer import loadTokenizer
 
 
 def parseTextFile(inputFile: str) -> list:
@@ -10,20 +15,28 @@ def parseTextFile(inputFile: str) -> list:
     """
     with open(inputFile, 'r') as f:
         text = f.read()
-        text = tokenize.sent_tokenize(text)
-
-    tkn = tokenize.TweetTokenizer()
-    text = [tkn.tokenize(sent) for sent in text]
-    return text
+    return loadTokenizer().tweetTokenize(text)
 
 
 def parseText(inputText: str) -> list:
     """
     Parse text file and return a list of sentences
     """
-    text = tokenize.sent_tokenize(inputText)
-    text = [tokenize.word_tokenize(sent) for sent in text]
-    return text
+    return loadTokenizer().parse(inputText)[0]
+
+
+def parseTexts(inputTexts: list) -> list:
+    """
+    Return parseText of many texts in one call
+    """
+    return [sentences for sentences, _, _ in loadTokenizer().parseMany(inputTexts)]
+
+
+def parseTextSpans(inputText: str) -> tuple:
+    """
+    Return parseText of a text, and the character offsets every sentence starts and ends at, as int64 arrays
+    """
+    return loadTokenizer().parse(inputText)
 
 
 def getWordFrequencies(words: list) -> Counter:
@@ -33,61 +46,214 @@ def getWordFrequencies(words: list) -> Counter:
     return Counter(words)
 
 
-def strHash(s: str) -> bin:
+# every word hash is two 20-bit polynomial hashes side by side, so sentence hashes are 40-bit integers
+HASH_BITS = 40
+HASH_MODULUS = 1000003
+HALF_BITS = 20
+
+# bit i of a hash, counted from the most significant, is (hash >> HASH_SHIFTS[i]) & 1
+HASH_SHIFTS = np.arange(HASH_BITS - 1, -1, -1, dtype=np.uint64)
+
+# number of set bits in every byte, for popcounts of whole uint64 arrays
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def strHash(s: str) -> int:
     """
-    Return a binary hash of a string as the sum of two polynomial rolling hashes
+    Return a 40-bit hash of a string as two polynomial rolling hashes side by side
     """
-    return hashFunction(s, 31) + hashFunction(s, 41)
+    return (hashFunction(s, 31) << HALF_BITS) | hashFunction(s, 41)
 
 
-def hashFunction(s: str, seed: int) -> str:
+def hashFunction(s: str, seed: int) -> int:
     """
-    Return a hash of a string via a polynomial rolling hash function given a seed
+    Return a 20-bit hash of a string via a polynomial rolling hash function given a seed
     Source: this hash function was inspired by https://cp-algorithms.com/string/string-hashing.html (translated from C++)
     """
     hashVal = 0
     p = 1
     for c in s:
-        hashVal = (hashVal + (ord(c) - ord('a') + 1) * p) % 1000003
-        p = (p * seed) % 1000003
-    return bin(hashVal)[2:].zfill(20)
+        hashVal = (hashVal + (ord(c) - ord('a') + 1) * p) % HASH_MODULUS
+        p = (p * seed) % HASH_MODULUS
+    return hashVal
 
 
-def getSentenceHash(sentence: str) -> int:
+def hashFunctions(words: list, seed: int) -> np.ndarray:
     """
-    Return a hash of a sentence
-    Source: hashing technique from https://www.youtube.com/watch?v=gnraT4N43qo (just idea not implementation)
+    Return hashFunction of every word at once, as an int64 array
+    The characters of all words are hashed as one array and summed per word, so no Python loop runs per character
     """
-    wordFrequencies = getWordFrequencies(sentence)
+    lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(words))
+    codes = np.frombuffer("".join(words).encode("utf-32-le"), dtype="<u4").astype(np.int64)
+
+    # position of every character within its word, and seed^position % HASH_MODULUS
+    positions = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    powers = np.ones(max(lengths.max(initial=0), 1), dtype=np.int64)
+    for i in range(1, len(powers)):
+        powers[i] = powers[i - 1] * seed % HASH_MODULUS
+
+    terms = np.mod((codes - ord('a') + 1) * powers[positions], HASH_MODULUS)
+    sums = np.bincount(np.repeat(np.arange(len(words)), lengths), weights=terms, minlength=len(words))
+    return sums.astype(np.int64) % HASH_MODULUS
+
 
-    wordHash = dict()
-    for word in wordFrequencies.keys():
-        wordHash[word] = [int(x) * wordFrequencies[word]
-                          if int(x) == 1 else -1 for x in strHash(word)]
+def strHashes(words: list) -> np.ndarray:
+    """
+    Return strHash of every word at once, as a uint64 array
+    """
+    return (hashFunctions(words, 31).astype(np.uint64) << np.uint64(HALF_BITS)) | hashFunctions(words, 41).astype(np.uint64)
 
-    sumHash = np.array(list(wordHash.values()))
-    sumHash = np.sum(sumHash, axis=0)
 
-    sumHash = ''.join(['1' if x > 0 else '0' for x in sumHash])
-    return sumHash
+def getSentenceHashes(sentences: list) -> np.ndarray:
+    """
+    Return the simhash of every sentence (a list of words) of a document as a uint64 array, see getSentenceHash
+    Each distinct word of the document is hashed once, then every vote is counted at once with two sparse products:
+    a word's frequency for each bit set in its hash, and -1 for each bit that is not
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in sentence:
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    # (sentences x words) frequencies, and whether each word is in each sentence at all
+    counts = csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+        shape=(len(sentences), len(vocabulary)),
+    )
+    counts.sum_duplicates()
+    present = counts.copy()
+    present.data[:] = 1
+
+    # (words x bits) hash bits
+    bits = ((strHashes(list(vocabulary))[:, np.newaxis] >> HASH_SHIFTS) & np.uint64(1)).astype(np.int64)
+    votes = np.asarray(counts @ bits) - np.asarray(present @ (1 - bits))
+    return ((votes > 0).astype(np.uint64) << HASH_SHIFTS).sum(axis=1, dtype=np.uint64)
+
+
+def getSentenceHash(sentence: list) -> int:
+    """
+    Return the 40-bit simhash of a sentence (a list of words) as an integer
+    Every word votes for the bits set in its hash with its frequency, and against the others with -1
+    Source: hashing technique from https://www.youtube.com/watch?v=gnraT4N43qo (just idea not implementation)
+    """
+    return int(getSentenceHashes([sentence])[0])
 
 
 def getHash(parsedText: list) -> list:
     """
-    Return a list of hashes of each sentence
+    Return a list of (sentence number, simhash) of each sentence, numbered from 1
+    """
+    return [(i + 1, int(h)) for i, h in enumerate(getSentenceHashes(parsedText))]
+
+
+def getHammingDistance(h1: int, h2: int) -> int:
+    """
+    Return the number of bits that are different between two hashes
+    """
+    return bin(h1 ^ h2).count("1")
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """
+    Return the number of set bits of every value of a uint64 array
     """
-    hashes = []
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return POPCOUNT_TABLE[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1, dtype=np.int64)
 
-    for i, sentence in enumerate(parsedText):
-        hashes.append((i + 1, getSentenceHash(sentence)))
-    return hashes
+
+def hammingMatrix(hashes1: np.ndarray, hashes2: np.ndarray) -> np.ndarray:
+    """
+    Return the len(hashes1) x len(hashes2) matrix of Hamming distances between two uint64 hash arrays
+    """
+    hashes1 = np.asarray(hashes1, dtype=np.uint64)
+    hashes2 = np.asarray(hashes2, dtype=np.uint64)
+    return popcount(hashes1[:, np.newaxis] ^ hashes2[np.newaxis, :])
 
 
-def getStringDifference(s1: str, s2: str) -> int:
+class HammingIndex:
     """
-    Return the number of chars that are different between two strings
+    Multi-index hashing over simhashes: finds every hash within Hamming distance k of a query without a full scan
+    Hashes are cut into blocks, each with its own table. Two hashes within distance k are within k // blocks on at least
+    one block (pigeonhole), so probing each table with the keys near the query's block finds every candidate
+    Wider blocks probe more keys, but each key holds fewer hashes. By default the number of blocks is the one with the
+    fewest probed keys plus expected candidates for the number of hashes, so large indexes stay selective
+    Source: Norouzi, Punjani and Fleet, Fast Search in Hamming Space with Multi-Index Hashing, CVPR 2012
     """
-    return sum(x != y for x, y in zip(s1, s2))
+
+    def __init__(self, hashes, k: int = 8, bits: int = HASH_BITS, blocks: int = None):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.k = k
+        if blocks is None:
+            blocks = min(range(1, min(bits, k + 1) + 1), key=lambda m: self.queryCost(len(self.hashes), k, bits, m))
+        self.radius = k // blocks
+
+        # (shift, width) of every block, widths differing by at most one bit
+        edges = np.linspace(0, bits, blocks + 1).astype(int)
+        self.blocks = [(int(lo), int(hi - lo)) for lo, hi in zip(edges[:-1], edges[1:])]
+
+        self.tables = []
+        for shift, width in self.blocks:
+            table = defaultdict(list)
+            keys = (self.hashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+            for i, key in enumerate(keys.tolist()):
+                table[key].append(i)
+            self.tables.append(table)
+
+        # xor masks of every key within radius of a block key, per block width
+        self.probes = {
+            width: [sum(1 << b for b in flipped) for r in range(self.radius + 1) for flipped in combinations(range(width), r)]
+            for width in {width for _, width in self.blocks}
+        }
+
+    @staticmethod
+    def queryCost(n: int, k: int, bits: int, blocks: int) -> float:
+        """
+        Return the keys a query probes plus the candidates it is expected to find, among n random hashes
+        """
+        cost = 0.0
+        for width in np.diff(np.linspace(0, bits, blocks + 1).astype(int)).tolist():
+            probes = sum(comb(width, r) for r in range(k // blocks + 1))
+            cost += probes + n * probes / 2 ** width
+        return cost
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def blockKeys(self, h: int) -> list:
+        """
+        Return the key of a hash in every block's table
+        """
+        return [(h >> shift) & ((1 << width) - 1) for shift, width in self.blocks]
+
+    def probeKeys(self, h: int) -> list:
+        """
+        Return the (block, key) of every table entry a query for a hash looks at
+        """
+        return [
+            (block, key ^ probe)
+            for block, ((_, width), key) in enumerate(zip(self.blocks, self.blockKeys(h)))
+            for probe in self.probes[width]
+        ]
+
+    def candidates(self, h: int) -> np.ndarray:
+        """
+        Return the positions of the indexed hashes sharing a probed block key with h, in position order
+        """
+        candidates = set()
+        for block, key in self.probeKeys(h):
+            candidates.update(self.tables[block].get(key, ()))
+        return np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+
+    def query(self, h: int) -> tuple:
+        """
+        Return the positions of the indexed hashes within distance k of h, and their distances, in position order
+        """
+        positions = self.candidates(h)
+        distances = popcount(self.hashes[positions] ^ np.uint64(h))
+        near = distances <= self.k
+        return positions[near], distances[near]
 
 
 def getSimilarSentences(hash1: list, hash2: list, k=8) -> list:
@@ -97,60 +263,115 @@ def getSimilarSentences(hash1: list, hash2: list, k=8) -> list:
     similarSentences = []
     paired1, paired2 = set(), set()
 
-    # iterate through first hash set and if a hash with a difference of i is found in the other set
-    # create a pair and move to next sentence do this for all i in range(k)
-    for i in range(0, k + 1):
-        for idx, sentenceHash in hash1:
-            if idx not in paired1:
-                for idx2, sentenceHash2 in hash2:
-                    if idx2 not in paired2:
-                        currDiff = getStringDifference(
-                            sentenceHash, sentenceHash2)
-                        if currDiff == i:
-                            similarSentences.append((idx, idx2))
-                            paired1.add(idx)
-                            paired2.add(idx2)
-                            break
+    # every pair within distance k, from the index of the second hash set
+    index = HammingIndex([h for _, h in hash2], k)
+    pairs = []
+    for row, (_, sentenceHash) in enumerate(hash1):
+        cols, distances = index.query(sentenceHash)
+        pairs.extend(zip(distances.tolist(), [row] * len(cols), cols.tolist()))
+
+    # pair the closest first, each sentence at most once, ties going to the earliest sentence in the first set
+    # then in the second, as scanning the sets once per distance from 0 to k did
+    for _, row, col in sorted(pairs):
+        idx, idx2 = hash1[row][0], hash2[col][0]
+        if idx not in paired1 and idx2 not in paired2:
+            similarSentences.append((idx, idx2))
+            paired1.add(idx)
+            paired2.add(idx2)
     return similarSentences
 
 
+# shortest shared passage reported by getLCS, in words
+MIN_PASSAGE_WORDS = 3
+
+
+class SuffixAutomaton:
+    """
+    Suffix automaton of a list of words: the smallest automaton accepting every contiguous passage of it
+    Built in time linear in the number of words, each state remembers where its passages first end
+    Source: https://cp-algorithms.com/string/suffix-automaton.html (over words instead of characters)
+    """
+
+    def __init__(self, words: list):
+        self.next = [{}]
+        self.link = [-1]
+        self.length = [0]
+        self.end = [-1]
+
+        last = 0
+        for i, word in enumerate(words):
+            cur = self._addState(self.length[last] + 1, i, {})
+            p = last
+            while p != -1 and word not in self.next[p]:
+                self.next[p][word] = cur
+                p = self.link[p]
+
+            if p == -1:
+                self.link[cur] = 0
+            else:
+                q = self.next[p][word]
+                if self.length[p] + 1 == self.length[q]:
+                    self.link[cur] = q
+                else:
+                    # split q, so every state keeps a single set of end positions
+                    clone = self._addState(self.length[p] + 1, self.end[q], dict(self.next[q]))
+                    self.link[clone] = self.link[q]
+                    while p != -1 and self.next[p].get(word) == q:
+                        self.next[p][word] = clone
+                        p = self.link[p]
+                    self.link[q] = self.link[cur] = clone
+            last = cur
+
+    def _addState(self, length: int, end: int, transitions: dict) -> int:
+        self.next.append(transitions)
+        self.link.append(-1)
+        self.length.append(length)
+        self.end.append(end)
+        return len(self.length) - 1
+
+    def matches(self, words: list):
+        """
+        Yield, for every position of words, the length of the longest passage ending there that the automaton accepts,
+        and the position its first occurrence ends at in the automaton's words (-1 if there is none)
+        """
+        state, length = 0, 0
+        for word in words:
+            while state and word not in self.next[state]:
+                state = self.link[state]
+                length = self.length[state]
+            if word in self.next[state]:
+                state = self.next[state][word]
+                length += 1
+            yield length, self.end[state]
+
+
+def commonPassages(words1: list, words2: list, minWords: int = MIN_PASSAGE_WORDS) -> list:
+    """
+    Return every maximal passage of at least minWords words found in both lists of words, in one pass over words1
+    Passages are (start1, start2, length) word positions, ordered by start1. A passage is maximal when it can not be
+    extended on either side and still be shared; maximal passages may overlap in words1
+    """
+    passages = []
+    previous = None
+    for i, (length, end) in enumerate(SuffixAutomaton(words2).matches(words1)):
+        # the longest match ending at i is reported once it stops growing
+        if previous and length != previous[0] + 1 and previous[0] >= minWords:
+            passages.append((i - previous[0], previous[1] - previous[0] + 1, previous[0]))
+        previous = (length, end)
+
+    if previous and previous[0] >= minWords:
+        passages.append((len(words1) - previous[0], previous[1] - previous[0] + 1, previous[0]))
+    return passages
+
+
 def getLCS(s1: list, s2: list) -> list:
     """
-    Return all common subsequences between two lists of words
-    """
-    s1 = " ".join([x.lower() for x in s1 if x.isalnum()])
-    s2 = " ".join([x.lower() for x in s2 if x.isalnum()])
-
-    # find the longest common substring between st1 and st2
-    def helperLCS(st1, st2):
-        # create an array of starting indicies of words so partial words matches are not considered
-        startIdxs = [0]
-        for i in range(len(st1)):
-            if i > 0 and st1[i-1] == ' ':
-                startIdxs.append(i)
-        startIdxs.append(len(st1))
-
-        # iterate over the start indicies and find the longest substring that has a match
-        longest = ""
-        for i in range(len(startIdxs)):
-            for j in range(i+1, len(startIdxs)):
-                curr = st1[startIdxs[i]:startIdxs[j]]
-                if curr in st2:
-                    if len(curr) > len(longest):
-                        longest = curr
-        return longest
-
-    # find the LCS then remove it from the strings and repeat until no LCS is found
-    commonSubsequences = []
-    while helperLCS(s1, s2) != "":
-        curr = helperLCS(s1, s2)
-        s1 = s1.replace(curr, "", 1)
-        s2 = s2.replace(curr, "", 1)
-        curr = curr.rstrip()
-        if (curr.count(' ')) >= 2:
-            commonSubsequences.append(curr)
-
-    return commonSubsequences
+    Return all common passages of at least MIN_PASSAGE_WORDS words between two lists of words
+    Words are lowercased and punctuation dropped first
+    """
+    s1 = [x.lower() for x in s1 if x.isalnum()]
+    s2 = [x.lower() for x in s2 if x.isalnum()]
+    return [" ".join(s1[start: start + length]) for start, _, length in commonPassages(s1, s2)]
 
 
 def getCommonSubstrings(text1: list, text2: list) -> str:
@@ -1,5 +1,7 @@
 # flake8: noqa
+import numpy as np
 from similarsubstrings import *
+from nltk import tokenize
 from pathlib import Path
 
 def test_set_1():
@@ -38,3 +40,133 @@ def test_set_2():
     for i, j in sims:
         print(getLCS(sentences1[i-1], sentences2[j-1]))
         print()
+
+
+def test_hamming():
+    '''
+    Test that sentence hashes are 40-bit integers, and that distances match bit-by-bit comparison
+    '''
+    sentence = "We the People of the United States , in Order to form a more perfect Union".split()
+    h1 = getSentenceHash(sentence)
+    h2 = getSentenceHash(sentence[:-1] + ["Nation"])
+    assert 0 <= h1 < 1 << HASH_BITS
+    assert getHammingDistance(h1, h1) == 0
+    assert getHammingDistance(h1, h2) == sum(x != y for x, y in zip(format(h1, "040b"), format(h2, "040b")))
+
+    distances = hammingMatrix([h1, h2], [h2, h1, 0])
+    assert distances.tolist() == [[getHammingDistance(a, b) for b in (h2, h1, 0)] for a in (h1, h2)]
+    assert getSimilarSentences([(1, h1), (2, h2)], [(1, h2), (2, h1)]) == [(1, 2), (2, 1)]
+
+
+def test_index():
+    '''
+    Test that the multi-index finds exactly the hashes a full scan finds, and that the closest pairs are made first
+    '''
+    gen = np.random.RandomState(0)
+    hashes = gen.randint(0, 1 << HASH_BITS, size=500, dtype=np.uint64)
+    queries = hashes[:100] ^ gen.randint(0, 1 << HASH_BITS, size=100, dtype=np.uint64) & np.uint64(0x0100801002)
+    for k in (0, 3, 8):
+        index = HammingIndex(hashes, k)
+        distances = hammingMatrix(queries, hashes)
+        for row, h in enumerate(queries):
+            positions, near = index.query(int(h))
+            assert positions.tolist() == np.flatnonzero(distances[row] <= k).tolist()
+            assert near.tolist() == distances[row][positions].tolist()
+
+    # ensure a large index only looks at a small share of its hashes
+    hashes = gen.randint(0, 1 << HASH_BITS, size=20000, dtype=np.uint64)
+    index = HammingIndex(hashes, 8)
+    queries = gen.randint(0, 1 << HASH_BITS, size=50, dtype=np.uint64)
+    assert np.mean([len(index.candidates(int(h))) for h in queries]) < 0.05 * len(hashes)
+
+    # sentence 1 is nearer to the second hash set's sentence 2, so sentence 2 gets sentence 1
+    hash1 = [(1, 0b1111), (2, 0b0001)]
+    hash2 = [(1, 0b0000), (2, 0b0111)]
+    assert getSimilarSentences(hash1, hash2, k=4) == [(1, 2), (2, 1)]
+    assert getSimilarSentences(hash1, hash2, k=0) == []
+
+
+def test_passages():
+    '''
+    Test that the suffix automaton finds every maximal shared passage, as checking every pair of passages does
+    '''
+    def shared(words1, words2, minWords):
+        passages2 = {tuple(words2[i:j]) for i in range(len(words2)) for j in range(i + 1, len(words2) + 1)}
+        return [
+            (i, j - i)
+            for i in range(len(words1)) for j in range(i + minWords, len(words1) + 1)
+            if tuple(words1[i:j]) in passages2
+            and (i == 0 or tuple(words1[i - 1:j]) not in passages2)
+            and (j == len(words1) or tuple(words1[i:j + 1]) not in passages2)
+        ]
+
+    gen = np.random.RandomState(0)
+    for _ in range(100):
+        words1 = [str(w) for w in gen.randint(0, 4, size=gen.randint(0, 30))]
+        words2 = [str(w) for w in gen.randint(0, 4, size=gen.randint(0, 30))]
+        passages = commonPassages(words1, words2, minWords=2)
+        assert [(start1, length) for start1, _, length in passages] == shared(words1, words2, 2)
+        assert all(words1[a:a + n] == words2[b:b + n] for a, b, n in passages)
+
+    s1 = "The quick brown fox jumps over the lazy dog , and then runs away".split()
+    s2 = "Yesterday the quick brown fox jumped over the lazy dog and then ran".split()
+    assert getLCS(s1, s2) == ["the quick brown fox", "over the lazy dog and then"]
+
+
+def test_batch():
+    '''
+    Test that hashing a document in one batch gives the same hashes as voting sentence by sentence
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    text = Path(testDirPath, "original1.txt").read_text()
+    sentences = [sentence.split() for sentence in text.split(".") if sentence.split()]
+
+    words = sorted({word for sentence in sentences for word in sentence}) + ["", "é", "Ω" * 200]
+    assert hashFunctions(words, 31).tolist() == [hashFunction(word, 31) for word in words]
+    assert strHashes(words).tolist() == [strHash(word) for word in words]
+
+    def vote(sentence):
+        counts = Counter(sentence)
+        sums = [0] * HASH_BITS
+        for word, count in counts.items():
+            for i, bit in enumerate(format(strHash(word), "0%db" % HASH_BITS)):
+                sums[i] += count if bit == "1" else -1
+        return int("".join("1" if x > 0 else "0" for x in sums), 2)
+
+    assert getSentenceHashes(sentences).tolist() == [vote(sentence) for sentence in sentences]
+    assert getHash(sentences) == [(i + 1, vote(sentence)) for i, sentence in enumerate(sentences)]
+    assert len(getSentenceHashes([])) == 0
+
+
+def test_spans():
+    '''
+    Test that sentence spans cut the same sentences out of the text as parseText tokenizes
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    text = Path(testDirPath, "s5.txt").read_text()
+
+    sentences, starts, ends = parseTextSpans(text)
+    assert sentences == parseText(text)
+    assert [text[start:end] for start, end in zip(starts, ends)] == tokenize.sent_tokenize(text)
+    assert np.all(starts[1:] >= ends[:-1])
+
+
+def test_tokenizer():
+    '''
+    Test that the shared tokenizer splits texts like sent_tokenize and word_tokenize, one text or many at once
+    '''
+    testDirPath = Path(__file__).parent.parent / "testdocs"
+    texts = [Path(testDirPath, name).read_text() for name in ("original2.txt", "s1.txt", "s5.txt")]
+
+    assert loadTokenizer() is loadTokenizer()
+    for text in texts:
+        assert parseText(text) == [tokenize.word_tokenize(sent) for sent in tokenize.sent_tokenize(text)]
+    assert parseTexts(texts) == [parseText(text) for text in texts]
+    assert parseTexts([]) == []
+
+    # sentences shared by several texts are tokenized once, but given to each of them
+    parsed = loadTokenizer().parseMany(texts + texts[:1])
+    assert parsed[-1][0] == parsed[0][0] == parseText(texts[0])
+    assert parsed[-1][0][0] is not parsed[0][0][0]
+    for (sentences, starts, ends), text in zip(parsed, texts):
+        assert (starts.tolist(), ends.tolist()) == tuple(x.tolist() for x in parseTextSpans(text)[1:])
@@ -0,0 +1,99 @@
+# flake8: noqa
+import threading
+
+import nltk
+import numpy as np
+from nltk.tokenize import NLTKWordTokenizer, TweetTokenizer
+
+
+def loadPunkt(language: str = "english"):
+    """
+    Return the punkt sentence tokenizer of a language, read from the NLTK data directory
+    NLTK 3.8.2 and later read the punkt_tab tables, earlier versions the punkt pickle
+    """
+    try:
+        from nltk.tokenize.punkt import PunktTokenizer
+    except ImportError:
+        return nltk.data.load(f"tokenizers/punkt/{language}.pickle")
+    return PunktTokenizer(language)
+
+
+class Tokenizer:
+    """
+    The sentence and word tokenizers of the simhash parser, loaded once and shared by every thread of a process
+    Tokenizing only reads the loaded models, so no lock is needed. Results are the same as sent_tokenize and
+    word_tokenize, without resolving and loading the punkt model through the NLTK data loader on every call
+    """
+
+    def __init__(self, language: str = "english"):
+        self.language = language
+        self.punkt = loadPunkt(language)
+        self.words = NLTKWordTokenizer()
+        self.tweets = TweetTokenizer()
+
+    def sentenceSpans(self, text: str) -> list:
+        """
+        Return the (start, end) character offsets of every sentence of a text, as sent_tokenize splits it
+        """
+        return list(self.punkt.span_tokenize(text))
+
+    def wordTokenize(self, sentence: str) -> list:
+        """
+        Return the words of a sentence, as word_tokenize splits them
+        """
+        return [word for part in self.punkt.tokenize(sentence) for word in self.words.tokenize(part)]
+
+    def parse(self, text: str) -> tuple:
+        """
+        Return the words of every sentence of a text, and the character offsets every sentence starts and ends at
+        """
+        spans = self.sentenceSpans(text)
+        sentences = [self.wordTokenize(text[start:end]) for start, end in spans]
+        starts = np.array([start for start, _ in spans], dtype=np.int64)
+        ends = np.array([end for _, end in spans], dtype=np.int64)
+        return sentences, starts, ends
+
+    def parseMany(self, texts: list) -> list:
+        """
+        Return parse of many texts in one call
+        Every text is still split into sentences on its own, but the sentences of all texts are word-tokenized
+        together, and a sentence found in several texts (as copied ones are) is only tokenized once
+        """
+        spans = [self.sentenceSpans(text) for text in texts]
+        unique = {}
+        for text, textSpans in zip(texts, spans):
+            for start, end in textSpans:
+                unique.setdefault(text[start:end], None)
+        words = dict(zip(unique, map(self.wordTokenize, unique)))
+
+        parsed = []
+        for text, textSpans in zip(texts, spans):
+            sentences = [list(words[text[start:end]]) for start, end in textSpans]
+            starts = np.array([start for start, _ in textSpans], dtype=np.int64)
+            ends = np.array([end for _, end in textSpans], dtype=np.int64)
+            parsed.append((sentences, starts, ends))
+        return parsed
+
+    def tweetTokenize(self, text: str) -> list:
+        """
+        Return the words of every sentence of a text, split by the tweet tokenizer
+        """
+        return [self.tweets.tokenize(sentence) for sentence in self.punkt.tokenize(text)]
+
+
+global tokenizer
+tokenizer = None
+_tokenizerLock = threading.Lock()
+
+
+def loadTokenizer(language: str = "english") -> Tokenizer:
+    """
+    Return the tokenizer of this process, loading it on first use
+    Call it once at startup, so no request pays for loading the models
+    """
+    global tokenizer
+    if tokenizer is None:
+        with _tokenizerLock:
+            if tokenizer is None:
+                tokenizer = Tokenizer(language)
+    return tokenizer
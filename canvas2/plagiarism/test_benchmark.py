@@ -0,0 +1,27 @@
+# flake8: noqa
+import json
+
+from canvas2.plagiarism.benchmark import syntheticCorpus, runBenchmark, LABELED_PAIRS
+
+
+def test_corpus():
+    '''
+    Test that the synthetic corpus is reproducible and streamed
+    '''
+    corpus = syntheticCorpus(5, seed=1)
+    assert next(corpus)
+    assert list(syntheticCorpus(5, seed=1)) == list(syntheticCorpus(5, seed=1))
+    assert list(syntheticCorpus(5, seed=1)) != list(syntheticCorpus(5, seed=2))
+
+
+def test_results():
+    '''
+    Test that results cover every engine and size, and can be written as JSON
+    '''
+    results = json.loads(json.dumps(runBenchmark(["minhash", "winnowing"], [3, 5])))
+
+    assert len(results["quality"]["winnowing"]["pairs"]) == len(LABELED_PAIRS)
+    assert 0.0 <= results["quality"]["minhash"]["auc"] <= 1.0
+    assert [(r["engine"], r["documents"]) for r in results["scale"]] == \
+        [("minhash", 3), ("winnowing", 3), ("minhash", 5), ("winnowing", 5)]
+    assert all(r["stored_bytes"] > 0 and r["peak_memory_bytes"] > 0 for r in results["scale"])
@@ -0,0 +1,81 @@
+# flake8: noqa
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from canvas2.plagiarism.engines import Engine, engines, registerEngine, getEngine, enginesFor, engineStats, \
+    DEPLOYMENT_ENGINES
+
+
+testDirPath = Path(__file__).parent / "testdocs"
+
+
+def readDoc(name: str) -> str:
+    with open(Path(testDirPath, name), "r") as f:
+        return f.read()
+
+
+def test_engines():
+    '''
+    Test that every engine's batch comparison agrees with its pairwise comparison
+    '''
+    docs = [readDoc(name) for name in ("original1.txt", "t1.txt", "t4.txt")]
+    for engine in engines.values():
+        fingerprints = [engine.fingerprint(doc) for doc in docs]
+        assert all(engine.isCurrent(data) for data in fingerprints)
+
+        matrix = engine.batchCompare(fingerprints)
+        for i in range(len(docs)):
+            for j in range(len(docs)):
+                if i != j:
+                    assert np.isclose(matrix[i, j], engine.compare(fingerprints[i], fingerprints[j]))
+
+        # ensure matches are explained with text taken from the documents
+        for s1, s2 in engine.explain(fingerprints[0], fingerprints[1], docs[0], docs[1]):
+            assert s1 and s2
+
+        assert engineStats()[engine.name]["fingerprint"]["calls"] >= len(docs)
+
+
+def test_codec():
+    '''
+    Test that an engine refuses fingerprints made by another engine
+    '''
+    minhash, winnowing = getEngine("minhash"), getEngine("winnowing")
+    data = minhash.fingerprint("four score and seven years ago")
+    assert minhash.isCurrent(data)
+    assert not winnowing.isCurrent(data)
+
+
+def test_registry():
+    '''
+    Test that courses pick their own engines, and fall back to the deployment's
+    '''
+    class UpperEngine(Engine):
+        name = "upper"
+        version = 1
+        field = "upper"
+
+        def _fingerprint(self, text):
+            return self.encode(0, np.frombuffer(text.upper().encode(), dtype=np.uint8))
+
+        def _compare(self, data1, data2):
+            return float(bytes(self.decode(data1)[0]) == bytes(self.decode(data2)[0]))
+
+    engine = registerEngine(UpperEngine())
+    try:
+        assert getEngine("upper") is engine
+        assert enginesFor({"engines": ["upper", "removed"]}) == [engine]
+        assert [e.name for e in enginesFor(None)] == [name for name in DEPLOYMENT_ENGINES if name in engines]
+
+        matrix = engine.batchCompare([engine.fingerprint(t) for t in ("ab", "AB", "cd")])
+        assert matrix.tolist() == [[1, 1, 0], [1, 1, 0], [0, 0, 1]]
+
+        # engines without usesWords refuse words, and every engine must compare
+        with pytest.raises(TypeError, match="upper"):
+            engine.fingerprintWords(["ab"])
+        with pytest.raises(TypeError):
+            type("Broken", (Engine,), {"_fingerprint": UpperEngine._fingerprint})()
+    finally:
+        del engines["upper"]
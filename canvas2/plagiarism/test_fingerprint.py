@@ -0,0 +1,29 @@
+# flake8: noqa
+import numpy as np
+
+from canvas2.plagiarism.fingerprint import encodeFingerprint, decodeFingerprint
+
+
+def test_roundtrip():
+    '''
+    Test that fingerprints keep their engine details and decode to views of the stored bytes
+    '''
+    hashes = np.array([3, 1, 4, 1, 5, 9, 2, 6], dtype=np.uint64)
+    positions = np.array([0, 7, 12], dtype=np.uint32)
+    data = encodeFingerprint("winnowing", 2, 5, hashes, positions)
+    fingerprint = decodeFingerprint(data)
+
+    assert (fingerprint.engine, fingerprint.version, fingerprint.k) == ("winnowing", 2, 5)
+    assert (fingerprint.arrays[0] == hashes).all() and (fingerprint.arrays[1] == positions).all()
+    assert not fingerprint.arrays[0].flags.owndata
+
+
+def test_corrupt():
+    '''
+    Test that bytes which are not a fingerprint are rejected
+    '''
+    try:
+        decodeFingerprint(b"\x00" * 64)
+    except ValueError:
+        return
+    assert False
@@ -0,0 +1,37 @@
+# flake8: noqa
+import numpy as np
+
+from canvas2.plagiarism.postings import encodePostings, decodePostings, mergePostings
+
+
+def test_roundtrip():
+    '''
+    Test that posting lists come back sorted and deduplicated, across every varint length
+    '''
+    gen = np.random.RandomState(0)
+    ids = np.concatenate((
+        gen.randint(0, 1 << 20, size=1000).astype(np.uint64),
+        np.array([0, 127, 128, 16383, 16384, (1 << 63) + 5, (1 << 64) - 1], dtype=np.uint64),
+    ))
+    decoded = decodePostings(encodePostings(ids))
+    assert np.array_equal(decoded, np.unique(ids))
+
+    assert encodePostings([]) == b""
+    assert len(decodePostings(b"")) == 0
+
+
+def test_compression():
+    '''
+    Test that dense lists take about a byte per id
+    '''
+    ids = np.arange(0, 30000, 3, dtype=np.uint64)
+    assert len(encodePostings(ids)) == len(ids)
+    assert encodePostings([300]) == bytes([0xAC, 0x02])
+
+
+def test_merge():
+    '''
+    Test that merging keeps the list sorted and unique
+    '''
+    data = encodePostings([5, 10, 20])
+    assert list(decodePostings(mergePostings(data, [1, 10, 30]))) == [1, 5, 10, 20, 30]
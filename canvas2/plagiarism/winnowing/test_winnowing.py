@@ -0,0 +1,68 @@
+# flake8: noqa
+from pathlib import Path
+
+import numpy as np
+
+from canvas2.plagiarism.winnowing.winnowing import winnow, kgramHashes, normalizedTokens, winnowFingerprint, \
+    winnowFromFingerprint, winnowSimilarity, matchedPassages, K, WINDOW, MIN_MATCH
+
+
+testDirPath = Path(__file__).parent.parent / "testdocs"
+
+
+def test_winnow():
+    '''
+    Test that every window keeps its rightmost minimum, and each position only once
+    '''
+    hashes = np.array([77, 74, 42, 17, 98, 50, 17, 98, 8, 88, 67, 39, 77, 74, 42, 17, 98], dtype=np.uint64)
+    positions = winnow(hashes, 4)
+
+    # example from the winnowing paper: fingerprints 17 17 8 39 17
+    assert list(hashes[positions]) == [17, 17, 8, 39, 17]
+    for i in range(len(hashes) - 3):
+        assert any(i <= p < i + 4 for p in positions)
+
+    assert len(winnow(np.empty(0, dtype=np.uint64))) == 0
+    assert list(winnow(np.array([5, 3], dtype=np.uint64))) == [1]
+
+
+def test_guarantee():
+    '''
+    Test that a copied passage of MIN_MATCH words is found and located in both documents
+    '''
+    with open(Path(testDirPath, "original1.txt"), "r") as f:
+        original = f.read()
+    with open(Path(testDirPath, "t4.txt"), "r") as f:
+        unrelated = f.read()
+
+    # copy a passage long enough to keep MIN_MATCH normalized words
+    words, starts, ends = normalizedTokens(original)
+    start, end = int(starts[100]), int(ends[100 + MIN_MATCH - 1])
+    passage = original[start: end]
+    copied = unrelated[:500] + " " + passage + " " + unrelated[500:]
+
+    passages = matchedPassages(winnowFingerprint(original), winnowFingerprint(copied))
+    assert passages
+    offset = len(unrelated[:500]) + 1
+    assert any(start <= s1 < end and offset <= s2 < offset + len(passage) for s1, e1, s2, e2 in passages)
+
+    # spans point at the matching text of each document
+    for s1, e1, s2, e2 in passages:
+        assert normalizedTokens(original[s1: e1])[0] == normalizedTokens(copied[s2: e2])[0]
+
+
+def test_fingerprint():
+    '''
+    Test that fingerprints are much smaller than the k-gram set, and score like Jaccard
+    '''
+    with open(Path(testDirPath, "original1.txt"), "r") as f:
+        original = f.read()
+
+    words = normalizedTokens(original)[0]
+    hashes, starts, ends = winnowFromFingerprint(winnowFingerprint(original))
+    assert len(hashes) < len(kgramHashes(words, K)) * 3 / (WINDOW + 1)
+    assert np.all(starts < ends)
+
+    assert winnowSimilarity(winnowFingerprint(original), winnowFingerprint(original)) == 1.0
+    assert winnowSimilarity(winnowFingerprint(""), winnowFingerprint(original)) == 0.0
+    assert winnowSimilarity(winnowFingerprint(""), winnowFingerprint("")) == 0.0
@@ -0,0 +1,134 @@
+# flake8: noqa
+import re
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..fingerprint import encodeFingerprint, decodeFingerprint, checkFingerprint
+from ..jaccard.jaccardsimilarity import lexicon, normalizeWord, SHINGLE_SEED, SHINGLE_PRIME, _mix64
+from ..jaccard.lexicon import wordKeys
+
+
+# stored with every fingerprint, bump VERSION whenever K, WINDOW or the hashing change
+ENGINE = "winnowing"
+VERSION = 1
+
+# k-grams are K normalized words long, and one hash is kept out of every WINDOW consecutive k-grams
+# since WINDOW < K, the k-grams kept from one shared passage overlap, so matches can be merged into passages
+K = 5
+WINDOW = 4
+
+# any shared passage of at least MIN_MATCH normalized words is guaranteed to share a fingerprint
+MIN_MATCH = K + WINDOW - 1
+
+TOKEN = re.compile(r"\S+")
+
+
+def normalizedTokens(text: str) -> tuple:
+    """
+    Return the words of a text normalized like parseText, along with the character span each came from
+    Returns (words, starts, ends), where text[starts[i]:ends[i]] is the original token of words[i]
+    """
+    words, starts, ends = [], [], []
+    for match in TOKEN.finditer(text):
+        word = re.sub(r"[^\w]", "", match.group()).lower()
+        if not word.isalnum() or lexicon.isStopword(word):
+            continue
+        word = normalizeWord(word)
+        if not word.isalnum() or lexicon.isStopword(word):
+            continue
+        words.append(word)
+        starts.append(match.start())
+        ends.append(match.end())
+    return words, np.array(starts, dtype=np.uint32), np.array(ends, dtype=np.uint32)
+
+
+def kgramHashes(words: list, k: int = K) -> np.ndarray:
+    """
+    Return the stable 64-bit hash of every k-gram of words, in order (k-gram i starts at word i)
+    """
+    n = len(words) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    # polynomial hash of the word keys of every window at once, wrapping modulo 2^64
+    keys = wordKeys(words)
+    h = np.full(n, SHINGLE_SEED, dtype=np.uint64)
+    for i in range(k):
+        h = h * SHINGLE_PRIME + keys[i: i + n]
+    return _mix64(h)
+
+
+def winnow(hashes: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """
+    Return the positions of the hashes selected by winnowing, in order
+    The minimum of every window of hashes is kept, the rightmost one on ties, and each position only once
+    Source: Schleimer, Wilkerson and Aiken, "Winnowing: Local Algorithms for Document Fingerprinting" (2003)
+    """
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(hashes) < window:
+        window = len(hashes)
+
+    # argmin returns the first minimum, so search each window backwards to get the rightmost one
+    windows = sliding_window_view(hashes, window)[:, ::-1]
+    positions = np.arange(len(windows)) + (window - 1 - windows.argmin(axis=1))
+
+    # neighbouring windows usually share their minimum, and positions never decrease
+    return np.unique(positions)
+
+
+def winnowFingerprint(text: str, k: int = K, window: int = WINDOW) -> bytes:
+    """
+    Return the winnowed k-gram hashes of a text with the character span of each k-gram, packed as a fingerprint
+    Only about 2 / (window + 1) of the k-grams are kept, instead of every shingle
+    """
+    words, starts, ends = normalizedTokens(text)
+    hashes = kgramHashes(words, k)
+    positions = winnow(hashes, window)
+    return encodeFingerprint(
+        ENGINE, VERSION, k,
+        hashes[positions], starts[positions], ends[positions + k - 1],
+    )
+
+
+def winnowFromFingerprint(data: bytes) -> tuple:
+    """
+    Return the (hashes, starts, ends) arrays stored in a fingerprint (read-only views, no copy)
+    Raises ValueError if the fingerprint was made by another engine or version
+    """
+    return checkFingerprint(decodeFingerprint(data), ENGINE, VERSION).arrays
+
+
+def winnowSimilarity(data1: bytes, data2: bytes) -> float:
+    """
+    Return the Jaccard similarity of the fingerprint hash sets of two documents
+    """
+    hashes1 = np.unique(winnowFromFingerprint(data1)[0])
+    hashes2 = np.unique(winnowFromFingerprint(data2)[0])
+    common = len(np.intersect1d(hashes1, hashes2, assume_unique=True))
+    union = len(hashes1) + len(hashes2) - common
+    return common / union if union else 0.0
+
+
+def matchedPassages(data1: bytes, data2: bytes) -> list:
+    """
+    Return the passages two documents share as (start1, end1, start2, end2) character spans
+    Spans index the texts the fingerprints were made from, so nothing has to be tokenized again
+    """
+    hashes1, starts1, ends1 = winnowFromFingerprint(data1)
+    hashes2, starts2, ends2 = winnowFromFingerprint(data2)
+    _, idx1, idx2 = np.intersect1d(hashes1, hashes2, return_indices=True)
+
+    # walk the matches in the order they appear in the first document, merging overlapping k-grams
+    passages = []
+    for i in np.argsort(starts1[idx1], kind="stable"):
+        a, b = idx1[i], idx2[i]
+        if passages:
+            last = passages[-1]
+            if starts1[a] <= last[1] and last[2] <= starts2[b] <= last[3]:
+                last[1] = max(last[1], int(ends1[a]))
+                last[3] = max(last[3], int(ends2[b]))
+                continue
+        passages.append([int(starts1[a]), int(ends1[a]), int(starts2[b]), int(ends2[b])])
+    return [tuple(p) for p in passages]
@@ -16,8 +16,11 @@
   const windowGrade = document.getElementById('window-grade');
   const gradeCells = [...document.querySelectorAll('.grade-cell')];
   const simScore = document.querySelector('.simscore');
+  const containment = document.querySelector('.containment');
   const confModal = document.querySelector('.confirmation-modal', HTMLElement);
   const subIdInput = document.querySelector('.sub-id-input');
+  const heatmap = document.querySelector('.heatmap');
+  const pendingCells = [...document.querySelectorAll('.sim-pending')];
 
   // Buttons
   const viewBtns = [...document.querySelectorAll('.view-btn')];
@@ -46,6 +49,7 @@
     commentGroup.textContent = 'Loading comments...';
     windowGrade.value = '*';
     simScore.textContent = 'Loading...';
+    containment.textContent = 'Loading...';
 
     reportBtn.setAttribute('data-id', sid);
 
@@ -88,6 +92,10 @@
 
             windowGrade.value = data['grade'];
             simScore.textContent = data['simscore'];
+            // share of this submission found in another one, and of another
+            // one found in this one
+            containment.textContent =
+              `${data['containment']} / ${data['coverage']}`;
           });
         }
       })
@@ -295,6 +303,90 @@
       }
     });
   };
+
+  /**
+   * Draws a heatmap of the similarity between every pair of submissions.
+   */
+  const loadHeatmap = () => {
+    const aid = heatmap.getAttribute('data-id');
+
+    const request = new Request(`/secretary/a/${aid}/similarity-matrix`, {
+      method: 'GET',
+    });
+
+    fetch(request).then((response) => {
+      if (!response.ok) {
+        heatmap.textContent = 'Could not load heatmap.';
+        return;
+      }
+
+      response.json().then((data) => {
+        heatmap.textContent = '';
+        if (data['labels'].length < 2) {
+          heatmap.textContent = 'Not enough submissions to compare.';
+          return;
+        }
+
+        const table = document.createElement('table');
+        data['matrix'].forEach((row, i) => {
+          const tr = document.createElement('tr');
+          const th = document.createElement('th');
+          th.textContent = data['labels'][i];
+          th.scope = 'row';
+          tr.appendChild(th);
+
+          row.forEach((score, j) => {
+            const td = document.createElement('td');
+            if (i !== j) {
+              td.style.backgroundColor = `rgba(192, 57, 43, ${score})`;
+              td.title = `${data['labels'][i]} / ${data['labels'][j]}: ${score}`;
+            } else {
+              td.classList.add('heatmap-self');
+            }
+            tr.appendChild(td);
+          });
+          table.appendChild(tr);
+        });
+        heatmap.appendChild(table);
+      });
+    });
+  };
+
+  /**
+   * Polls the status of a submission that is still being checked, and shows
+   * its score once a worker is done with it.
+   *
+   * @param {HTMLElement} cell Sim score cell of the submission
+   */
+  const pollStatus = (cell) => {
+    const sid = cell.getAttribute('data-id');
+
+    const request = new Request(`/secretary/s/${sid}/status`, {
+      method: 'GET',
+    });
+
+    fetch(request)
+      .then((response) => {
+        if (response.ok) {
+          response.json().then((data) => {
+            if (data['status'] === 'done') {
+              cell.textContent = data['simscore'];
+              cell.classList.remove('sim-pending');
+            } else if (data['status'] === 'failed') {
+              cell.textContent = 'Could not check';
+              cell.classList.remove('sim-pending');
+            } else {
+              cell.textContent = `${data['status']}...`;
+              setTimeout(() => pollStatus(cell), 3000);
+            }
+          });
+        }
+      })
+      .catch((error) => {
+        console.log(error);
+      });
+  };
+
   // Event listeners
 
   closeBtnEditAssg.addEventListener('click', closePopupEditAssg);
@@ -328,4 +420,12 @@
     btn.addEventListener('click', showConfirmation);
   });
   cancelBtn.addEventListener('click', hideConfirmation);
+
+  if (heatmap) {
+    loadHeatmap();
+  }
+
+  pendingCells.forEach((cell) => {
+    setTimeout(() => pollStatus(cell), 3000);
+  });
 })();
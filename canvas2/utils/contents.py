@@ -0,0 +1,106 @@
+import hashlib
+import zlib
+from datetime import datetime, timezone
+
+from bson import Binary
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from ..plagiarism.engines import enginesFor, getEngine
+from ..plagiarism.jaccard.jaccardsimilarity import parseText
+
+# entries no submission has used for this long are dropped
+UNUSED_SECONDS = 180 * 24 * 60 * 60
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to find duplicate submissions."""
+
+    # exact duplicates within an assignment, see similarity.py
+    db.submissions.create_index(
+        [("assignment", ASCENDING), ("digest", ASCENDING)]
+    )
+
+    # entries are shared, so they expire on last use rather than on delete
+    db.contents.create_index("used", expireAfterSeconds=UNUSED_SECONDS)
+
+
+def content_digest(text):
+    """Returns the key of a text in the contents store.
+
+    Only trailing whitespace is ignored. Anything else, like case or inner
+    whitespace, would shift the character positions stored in fingerprints
+    such as winnowing's, which must stay valid for every text sharing them.
+    """
+
+    return hashlib.sha256(text.rstrip().encode("utf8")).hexdigest()
+
+
+def _pack_words(words):
+    """Returns normalized words compressed for storage."""
+
+    return Binary(zlib.compress(" ".join(words).encode("utf8")))
+
+
+def _unpack_words(data):
+    """Returns the normalized words packed by _pack_words."""
+
+    return zlib.decompress(data).decode("utf8").split()
+
+
+def submission_engines(course):
+    """Returns the engines a course's submissions are fingerprinted with.
+
+    NOTE: minhash always runs, since simscore and the band index use it
+    """
+
+    selected = enginesFor(course)
+    if getEngine("minhash") not in selected:
+        selected.append(getEngine("minhash"))
+    return selected
+
+
+def fingerprint_contents(db, text, engines):
+    """Returns the digest of a text and its fingerprint for every engine,
+    as a {field: fingerprint} dict.
+
+    Fingerprints already stored for the same text by a current version of
+    an engine are reused as they are. Missing ones are computed from the
+    stored normalized words where the engine allows it, so a text is only
+    normalized once, and saved for the next identical submission.
+    """
+
+    digest = content_digest(text)
+    entry = db.contents.find_one({"_id": digest}) or {}
+    stored = entry.get("fingerprints", {})
+
+    fingerprints = {}
+    update = {"used": datetime.now(timezone.utc)}
+    words = None
+    for engine in engines:
+        data = stored.get(engine.field)
+        if data is not None and engine.isCurrent(data):
+            fingerprints[engine.field] = bytes(data)
+            continue
+
+        if not engine.usesWords:
+            data = engine.fingerprint(text)
+        else:
+            # normalize once, and only if some engine can use the words
+            if words is None:
+                if "words" in entry:
+                    words = _unpack_words(entry["words"])
+                else:
+                    words = parseText(text)
+                    update["words"] = _pack_words(words)
+            data = engine.fingerprintWords(words)
+        fingerprints[engine.field] = data
+        update[f"fingerprints.{engine.field}"] = Binary(data)
+
+    # two workers may insert the same new text at once, the loser retries
+    # as an update
+    try:
+        db.contents.update_one({"_id": digest}, {"$set": update}, upsert=True)
+    except DuplicateKeyError:
+        db.contents.update_one({"_id": digest}, {"$set": update})
+    return digest, fingerprints
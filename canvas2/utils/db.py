@@ -3,6 +3,8 @@ from urllib.request import urlopen
 from flask_pymongo import PyMongo
 from pymongo.errors import ServerSelectionTimeoutError
 
+from . import contents, jobs, lsh, postings, reports, similarity
+
 # static vars
 db_conn = None
 
@@ -51,3 +53,11 @@ def init_db(app):
             )
             print(f"Your current IP: {external_ip}")
             exit(-1)
+
+        # make sure the indexes our lookups rely on exist
+        lsh.ensure_indexes(db_conn.db)
+        jobs.ensure_indexes(db_conn.db)
+        postings.ensure_indexes(db_conn.db)
+        contents.ensure_indexes(db_conn.db)
+        similarity.ensure_indexes(db_conn.db)
+        reports.ensure_indexes(db_conn.db)
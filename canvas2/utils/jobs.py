@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, ReturnDocument
+
+# job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# how long a worker may hold a job before another worker can take it over
+VISIBILITY_TIMEOUT = 300
+
+# attempts before a job is given up on, and the delay before the first retry
+# NOTE: the delay doubles after every failed attempt
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 10
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to claim jobs."""
+
+    # claim() looks up the oldest runnable job of a state
+    db.jobs.create_index(
+        [("status", ASCENDING), ("run_at", ASCENDING)]
+    )
+
+    # used to find the job of a submission
+    db.jobs.create_index("payload.submission", sparse=True)
+
+    # finished jobs are only kept around for a week
+    db.jobs.create_index(
+        "finished", expireAfterSeconds=7 * 24 * 60 * 60
+    )
+
+
+def enqueue(db, kind, payload, max_attempts=MAX_ATTEMPTS):
+    """Adds a job to the queue and returns its id."""
+
+    now = datetime.now(timezone.utc)
+    return db.jobs.insert_one(
+        {
+            "kind": kind,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now,
+            "created": now,
+        }
+    ).inserted_id
+
+
+def claim(db, worker, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Leases the next runnable job to a worker and returns it.
+
+    A job is runnable when it is queued and its retry delay has passed, or
+    when it is running but its lease has expired, i.e. the worker holding it
+    died, and it has attempts left. The lease is taken with a single atomic
+    update, so two workers can never claim the same job. Returns None if
+    there is nothing to do.
+    """
+
+    now = datetime.now(timezone.utc)
+    return db.jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                {
+                    "status": RUNNING,
+                    "lease_until": {"$lt": now},
+                    "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                },
+            ]
+        },
+        {
+            "$set": {
+                "status": RUNNING,
+                "worker": worker,
+                "lease_until": now + timedelta(seconds=visibility_timeout),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def reap(db):
+    """Marks failed every job whose lease expired on its last attempt.
+
+    Such a job most likely killed the worker running it, so it is not
+    leased again. Returns the jobs marked, so their failure hooks can run.
+    """
+
+    reaped = []
+    while True:
+        now = datetime.now(timezone.utc)
+        job = db.jobs.find_one_and_update(
+            {
+                "status": RUNNING,
+                "lease_until": {"$lt": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {
+                    "status": FAILED,
+                    "error": "lease expired on the last attempt",
+                    "finished": now,
+                },
+                "$unset": {"lease_until": ""},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return reaped
+        reaped.append(job)
+
+
+def complete(db, job):
+    """Marks a job done."""
+
+    db.jobs.update_one(
+        {"_id": job["_id"], "worker": job["worker"]},
+        {
+            "$set": {
+                "status": DONE,
+                "finished": datetime.now(timezone.utc),
+            },
+            "$unset": {"lease_until": ""},
+        },
+    )
+
+
+def fail(db, job, error, retry_delay=RETRY_DELAY):
+    """Records a failed attempt at a job.
+
+    The job is queued again after a growing delay, or marked failed once it
+    has used up its attempts. Returns True if the job will be retried.
+    """
+
+    now = datetime.now(timezone.utc)
+    retry = job["attempts"] < job["max_attempts"]
+    update = {
+        "$set": {"error": str(error)},
+        "$unset": {"lease_until": ""},
+    }
+    if retry:
+        delay = retry_delay * 2 ** (job["attempts"] - 1)
+        update["$set"]["status"] = QUEUED
+        update["$set"]["run_at"] = now + timedelta(seconds=delay)
+    else:
+        update["$set"]["status"] = FAILED
+        update["$set"]["finished"] = now
+
+    db.jobs.update_one({"_id": job["_id"], "worker": job["worker"]}, update)
+    return retry
+
+
+def queue_stats(db):
+    """Returns the number of jobs in each state."""
+
+    counts = db.jobs.aggregate(
+        [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    )
+    stats = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+    stats.update({x["_id"]: x["count"] for x in counts})
+    return stats
@@ -0,0 +1,95 @@
+from pymongo import ASCENDING, UpdateOne
+
+from ..plagiarism.jaccard.lsh import bandKeys, candidatePairs, optimalParams
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to look up LSH buckets."""
+
+    # one document per (assignment, band layout, band, key) bucket
+    db.lsh_buckets.create_index(
+        [
+            ("assignment", ASCENDING),
+            ("bands", ASCENDING),
+            ("rows", ASCENDING),
+            ("band", ASCENDING),
+            ("key", ASCENDING),
+        ],
+        unique=True,
+    )
+
+    # used when a submission is removed from every bucket it is in
+    db.lsh_buckets.create_index("submissions")
+
+
+def band_layout(threshold, num_perm):
+    """Returns the [bands, rows] layout used for a similarity threshold.
+
+    This is stored on each submission as `lsh`, so submissions indexed
+    under a different threshold can be told apart and re-indexed.
+    """
+
+    return list(optimalParams(threshold, num_perm))
+
+
+def index_submission(db, assignment, submission, signature, threshold):
+    """Adds a submission's signature to its assignment's band index."""
+
+    bands, rows = band_layout(threshold, len(signature))
+    keys = bandKeys(signature, bands, rows)
+
+    # upsert every bucket in one round trip
+    db.lsh_buckets.bulk_write(
+        [
+            UpdateOne(
+                {
+                    "assignment": assignment,
+                    "bands": bands,
+                    "rows": rows,
+                    "band": band,
+                    "key": key,
+                },
+                {"$addToSet": {"submissions": submission}},
+                upsert=True,
+            )
+            for band, key in enumerate(keys)
+        ],
+        ordered=False,
+    )
+
+
+def remove_submission(db, submission):
+    """Removes a submission from every bucket it was indexed in."""
+
+    db.lsh_buckets.update_many(
+        {"submissions": submission},
+        {"$pull": {"submissions": submission}},
+    )
+    db.lsh_buckets.delete_many({"submissions": {"$size": 0}})
+
+
+def remove_assignment(db, assignment):
+    """Drops the whole band index of an assignment."""
+
+    db.lsh_buckets.delete_many({"assignment": assignment})
+
+
+def candidate_pairs(db, assignment, threshold, num_perm):
+    """Returns the submission pairs of an assignment that share a bucket.
+
+    Only buckets holding two or more submissions are read back, so the work
+    done here grows with the number of likely-similar pairs rather than
+    with the square of the number of submissions.
+    """
+
+    bands, rows = optimalParams(threshold, num_perm)
+    buckets = db.lsh_buckets.find(
+        {
+            "assignment": assignment,
+            "bands": bands,
+            "rows": rows,
+            "submissions.1": {"$exists": True},
+        },
+        {"submissions": 1},
+    )
+    return candidatePairs(b["submissions"] for b in buckets)
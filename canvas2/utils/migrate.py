@@ -0,0 +1,252 @@
+import ast
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from ..plagiarism.jaccard.minhash import minhashSignature, \
+    signatureFromBytes, signatureToFingerprint
+from ..plagiarism.simhash.tokenizer import loadTokenizer
+from .contents import fingerprint_contents, submission_engines
+from .jobs import QUEUED, RUNNING, enqueue
+from .postings import index_submission
+from .reports import engines_key, invalidate_assignment
+from .similarity import backfill_scores, score_submission
+
+# shingle length every stored parsedContents set was built with
+LEGACY_K = 5
+
+# submissions saved this recently may still be about to get their job
+REQUEUE_SECONDS = 60
+
+
+def legacy_fingerprint(submission):
+    """Returns the fingerprint of a submission stored in an older format.
+
+    `parsedContents` holds the repr() of a shingle set, which is parsed with
+    ast.literal_eval so stored text is never executed. `signature` holds a
+    bare minhash signature from before fingerprints were versioned.
+    """
+
+    if "signature" in submission:
+        signature = signatureFromBytes(submission["signature"])
+    else:
+        # repr() of an empty set is not a literal
+        parsed = submission["parsedContents"]
+        shingles = set() if parsed == "set()" else ast.literal_eval(parsed)
+        signature = minhashSignature(shingles)
+    return signatureToFingerprint(signature, LEGACY_K)
+
+
+def migrate_submission(db, submission):
+    """Converts one submission to a fingerprint and returns it."""
+
+    fingerprint = legacy_fingerprint(submission)
+    db.submissions.update_one(
+        {"_id": submission["_id"]},
+        {
+            "$set": {"fingerprint": fingerprint},
+            "$unset": {"parsedContents": "", "signature": ""},
+        }
+    )
+    return fingerprint
+
+
+def migrate_fingerprints(db, batch_size=100):
+    """Converts every submission still stored in an older format.
+
+    Returns the number of submissions converted. Submissions that cannot
+    be parsed are reported and skipped, so one bad document does not stop
+    the rest of the migration.
+    """
+
+    migrated = 0
+    query = {
+        "fingerprint": {"$exists": False},
+        "$or": [
+            {"parsedContents": {"$exists": True}},
+            {"signature": {"$exists": True}},
+        ],
+    }
+    projection = {"parsedContents": 1, "signature": 1}
+    skipped = set()
+
+    while True:
+        batch = list(
+            db.submissions.find(
+                {**query, "_id": {"$nin": list(skipped)}}, projection
+            ).limit(batch_size)
+        )
+        if not batch:
+            return migrated
+
+        for submission in batch:
+            try:
+                migrate_submission(db, submission)
+                migrated += 1
+            except (ValueError, SyntaxError, TypeError):
+                print(f"Could not migrate submission {submission['_id']}")
+                skipped.add(submission["_id"])
+
+
+def requeue_submissions(db, grace=REQUEUE_SECONDS):
+    """Enqueues a fingerprint job for every submission left "queued" without
+    one, i.e. the server died between saving it and enqueueing its job.
+
+    Returns the number of submissions enqueued.
+    """
+
+    requeued = 0
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace)
+    queued = db.submissions.find(
+        {"status": QUEUED, "_id": {"$lt": ObjectId.from_datetime(cutoff)}},
+        {"_id": 1},
+    )
+    for submission in queued:
+        pending = db.jobs.find_one(
+            {
+                "kind": "fingerprint",
+                "payload.submission": submission["_id"],
+                "status": {"$in": [QUEUED, RUNNING]},
+            },
+            {"_id": 1},
+        )
+        if not pending:
+            enqueue(db, "fingerprint", {"submission": submission["_id"]})
+            requeued += 1
+    return requeued
+
+
+def refingerprint_submission(db, submission, engines, threshold):
+    """Fingerprints a submission with every engine it has no current
+    fingerprint of, then scores and indexes it again where needed.
+
+    Returns whether anything was fingerprinted.
+    """
+
+    stale = [
+        engine for engine in engines
+        if engine.field not in submission
+        or not engine.isCurrent(submission[engine.field])
+    ]
+    update = {"fingerprinted": engines_key(engines)}
+    if stale:
+        digest, fingerprints = fingerprint_contents(
+            db, submission["contents"], stale
+        )
+        submission.update(fingerprints, digest=digest)
+        update.update(fingerprints, digest=digest)
+    db.submissions.update_one({"_id": submission["_id"]}, {"$set": update})
+    if not stale:
+        return False
+
+    # a new signature must be banded again, not just scored
+    if "fingerprint" in fingerprints:
+        submission.pop("lsh", None)
+        score_submission(db, submission, threshold)
+    if "winnowing" in fingerprints:
+        index_submission(db, submission)
+
+    # its sentences may now be the closest source of any other submission's
+    if "simhash" in fingerprints:
+        invalidate_assignment(db, submission["assignment"])
+    return True
+
+
+def refingerprint_submissions(db, threshold):
+    """Fingerprints every submission made before one of its course's
+    engines was enabled, or by an older version of one, so requests never
+    have to.
+
+    Submissions record the engines they were last fingerprinted with, so
+    only ones whose course's engines changed since are looked at again.
+    Returns the number of submissions fingerprinted.
+    """
+
+    fingerprinted = 0
+    for course in db.classes.find({}, {"engines": 1}):
+        selected = submission_engines(course)
+        pending = db.submissions.find(
+            {
+                "class": course["_id"],
+                "status": {"$nin": [QUEUED, "processing"]},
+                "contents": {"$exists": True},
+                "fingerprinted": {"$ne": engines_key(selected)},
+            },
+            {
+                "assignment": 1,
+                "contents": 1,
+                "digest": 1,
+                "lsh": 1,
+                "seq": 1,
+                **{engine.field: 1 for engine in selected},
+            },
+        )
+        for submission in pending:
+            fingerprinted += refingerprint_submission(
+                db, submission, selected, threshold
+            )
+    return fingerprinted
+
+
+def drop_sentence_index(db):
+    """Drops the per-sentence index older versions kept, now that sentences
+    are matched from the stored simhash fingerprints, see sentences.py."""
+
+    db.drop_collection("sentences")
+    db.submissions.update_many(
+        {"sentence_index": {"$exists": True}},
+        {"$unset": {"sentence_index": ""}}
+    )
+
+
+def run_migrations(db, threshold):
+    """Converts old submissions, requeues any whose job was lost,
+    fingerprints any missing a current fingerprint, then scores any that
+    were never scored."""
+
+    migrate_fingerprints(db)
+    drop_sentence_index(db)
+    requeue_submissions(db)
+
+    # load the tokenizers here rather than when the app starts, so no
+    # request pays for loading them and missing NLTK data cannot stop the
+    # app, nor the migrations that do not need them
+    try:
+        loadTokenizer()
+    except LookupError:
+        traceback.print_exc()
+    refingerprint_submissions(db, threshold)
+    return backfill_scores(db, threshold)
+
+
+def start_migrator(db, threshold):
+    """Runs run_migrations on a daemon thread."""
+
+    thread = threading.Thread(
+        target=run_migrations,
+        args=(db, threshold),
+        name="fingerprint-migrator",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # NOTE: MONGO_URI ends with the database name, see utils/db.py
+    client = MongoClient(os.environ["MONGO_URI"])
+    db = client.get_default_database()
+    count = migrate_fingerprints(db)
+    print(f"Migrated {count} submissions")
+    drop_sentence_index(db)
+    count = requeue_submissions(db)
+    print(f"Requeued {count} submissions")
+    threshold = float(os.environ.get("SIMILARITY_THRESHOLD", 0.3))
+    count = refingerprint_submissions(db, threshold)
+    print(f"Fingerprinted {count} submissions")
+    count = backfill_scores(db, threshold)
+    print(f"Scored {count} submissions")
@@ -0,0 +1,191 @@
+import numpy as np
+from bson import Binary
+from pymongo import ReturnDocument, UpdateOne
+
+from ..plagiarism.postings import decodePostings, encodePostings
+from ..plagiarism.winnowing.winnowing import winnowFromFingerprint
+
+# once this many ids are waiting in a posting's tail, they are compressed
+TAIL_LIMIT = 64
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to look up posting lists."""
+
+    # postings are looked up by their _id (the hash), so only the sequence
+    # numbers of submissions need an index
+    db.submissions.create_index("seq", unique=True, sparse=True)
+
+
+def _keys(hashes):
+    """Returns uint64 hashes as the signed ints BSON can store."""
+
+    return [int(x) for x in np.unique(hashes).view(np.int64)]
+
+
+def next_seq(db, name):
+    """Returns the next number of a counter, starting at 1."""
+
+    counter = db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+def index_submission(db, submission):
+    """Adds a submission's winnowing hashes to the inverted index.
+
+    Posting lists hold small sequence numbers rather than ObjectIds, so the
+    gaps between them stay small. New numbers are added to an uncompressed
+    `tail` with $addToSet, which is atomic and safe to repeat, and merged
+    into the compressed `block` once the tail grows past TAIL_LIMIT.
+    """
+
+    seq = submission.get("seq")
+    if seq is None:
+        seq = next_seq(db, "submissions")
+        db.submissions.update_one(
+            {"_id": submission["_id"]},
+            {"$set": {"seq": seq}}
+        )
+
+    keys = _keys(winnowFromFingerprint(submission["winnowing"])[0])
+    if not keys:
+        return seq
+    db.postings.bulk_write(
+        [
+            UpdateOne(
+                {"_id": key},
+                {"$addToSet": {"tail": seq}},
+                upsert=True,
+            )
+            for key in keys
+        ],
+        ordered=False,
+    )
+    compact_postings(db, keys)
+    return seq
+
+
+def remove_postings(db, submission):
+    """Removes a deleted submission from the inverted index.
+
+    Its sequence number is pulled from the tails right away. Compressed
+    blocks cannot be edited in place, so the number is also listed in the
+    `removed` ids of postings with a block, which are skipped when reading
+    and dropped from the block on its next compaction.
+    """
+
+    seq = submission.get("seq")
+    if seq is None or "winnowing" not in submission:
+        return
+
+    keys = _keys(winnowFromFingerprint(submission["winnowing"])[0])
+    if not keys:
+        return
+    db.postings.update_many(
+        {"_id": {"$in": keys}},
+        {"$pull": {"tail": seq}}
+    )
+    db.postings.update_many(
+        {"_id": {"$in": keys}, "block": {"$exists": True}},
+        {"$addToSet": {"removed": seq}}
+    )
+    compact_postings(db, keys)
+
+
+def compact_postings(db, keys, tail_limit=TAIL_LIMIT):
+    """Merges long tails into their compressed blocks, and drops removed
+    ids from them.
+
+    A block is only replaced if nobody else compacted it in the meantime,
+    and only the merged and dropped ids are pulled, so ids added or
+    removed concurrently are never lost.
+    """
+
+    full = db.postings.find(
+        {
+            "_id": {"$in": keys},
+            "$or": [
+                {f"tail.{tail_limit - 1}": {"$exists": True}},
+                {f"removed.{tail_limit - 1}": {"$exists": True}},
+            ],
+        }
+    )
+    for posting in full:
+        tail = posting.get("tail", [])
+        removed = posting.get("removed", [])
+        block = np.setdiff1d(
+            decodePostings(posting.get("block", b"")),
+            np.asarray(removed, dtype=np.uint64),
+        )
+        db.postings.update_one(
+            {"_id": posting["_id"], "block": posting.get("block")},
+            {
+                "$set": {"block": Binary(encodePostings(
+                    np.concatenate((block, np.asarray(tail, np.uint64)))
+                ))},
+                "$pullAll": {"tail": tail, "removed": removed},
+            }
+        )
+
+
+def _decode(posting):
+    """Returns every live sequence number in a posting list."""
+
+    ids = np.asarray(posting.get("tail", []), dtype=np.uint64)
+    if posting.get("block"):
+        ids = np.concatenate((decodePostings(posting["block"]), ids))
+    return np.setdiff1d(
+        ids, np.asarray(posting.get("removed", []), dtype=np.uint64)
+    )
+
+
+def top_candidates(db, submission, limit=10):
+    """Returns the submissions, from any assignment or course, sharing the
+    most winnowing hashes with this one.
+
+    Only the posting lists of the submission's own hashes are read, so the
+    work done depends on the number of matching postings, not on the
+    number of submissions. Returns (submission, shared, score) tuples, best
+    first, where score is the fraction of this submission's hashes found in
+    the other one.
+    """
+
+    keys = _keys(winnowFromFingerprint(submission["winnowing"])[0])
+    if not keys:
+        return []
+
+    postings = [_decode(p) for p in db.postings.find({"_id": {"$in": keys}})]
+    if not postings:
+        return []
+    seqs, shared = np.unique(np.concatenate(postings), return_counts=True)
+
+    # deleted submissions are removed from postings, but one deleted while
+    # this runs may still be listed, so keep going until enough are found
+    order = np.argsort(-shared, kind="stable")
+    if submission.get("seq") is not None:
+        order = order[seqs[order] != submission["seq"]]
+    candidates = []
+    for start in range(0, len(order), 2 * limit + 1):
+        best = {
+            int(seqs[i]): int(shared[i])
+            for i in order[start: start + 2 * limit + 1]
+        }
+        others = db.submissions.find(
+            {"seq": {"$in": list(best)}},
+            {"seq": 1, "assignment": 1, "class": 1}
+        )
+        candidates += [
+            (other, best[other["seq"]],
+             round(best[other["seq"]] / len(keys), 2))
+            for other in others
+        ]
+        if len(candidates) >= limit:
+            break
+
+    candidates.sort(key=lambda x: x[1], reverse=True)
+    return candidates[:limit]
@@ -0,0 +1,189 @@
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from ..plagiarism.engines import getEngine
+from .sentences import sources_report
+
+# cached reports are rebuilt at least this often, whatever happens
+REPORT_SECONDS = 7 * 24 * 60 * 60
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to look up and invalidate cached reports."""
+
+    # one report per pair of submissions and set of engine versions
+    db.reports.create_index(
+        [
+            ("submission", ASCENDING),
+            ("other", ASCENDING),
+            ("engines", ASCENDING),
+        ],
+        unique=True,
+    )
+
+    # used when a submission is deleted or rescored
+    db.reports.create_index("other")
+    db.reports.create_index("sources")
+    db.reports.create_index("assignment")
+
+    db.reports.create_index("created", expireAfterSeconds=REPORT_SECONDS)
+
+
+def engines_key(engines):
+    """Returns the names and versions of some engines as one string, so a
+    report made by an older version of any engine is never found."""
+
+    return ",".join(f"{engine.name}:{engine.version}" for engine in engines)
+
+
+def cached_report(db, submission_id, other_id, engines):
+    """Returns the cached report comparing two submissions, or None."""
+
+    cached = db.reports.find_one(
+        {
+            "submission": submission_id,
+            "other": other_id,
+            "engines": engines_key(engines),
+        },
+        {"report": 1},
+    )
+    return cached["report"] if cached else None
+
+
+def cache_report(db, submission, other_id, engines, report, sources=()):
+    """Caches a report comparing a submission with another one.
+
+    `sources` are the other submissions the report quotes, so deleting any
+    of them invalidates it too.
+    NOTE: a submission rescored while its report was being built can leave
+          that report cached until REPORT_SECONDS have passed
+    """
+
+    key = {
+        "submission": submission["_id"],
+        "other": other_id,
+        "engines": engines_key(engines),
+    }
+    update = {
+        "$set": {
+            "assignment": submission.get("assignment"),
+            "sources": list(sources),
+            "report": report,
+            "created": datetime.now(timezone.utc),
+        }
+    }
+
+    # two requests may cache the same report at once, the loser updates
+    try:
+        db.reports.update_one(key, update, upsert=True)
+    except DuplicateKeyError:
+        db.reports.update_one(key, update)
+
+
+def invalidate_submissions(db, submission_ids):
+    """Drops every cached report about, against or quoting submissions that
+    were deleted or rescored."""
+
+    submission_ids = list(submission_ids)
+    if submission_ids:
+        db.reports.delete_many(
+            {
+                "$or": [
+                    {"submission": {"$in": submission_ids}},
+                    {"other": {"$in": submission_ids}},
+                    {"sources": {"$in": submission_ids}},
+                ]
+            }
+        )
+
+
+def invalidate_assignment(db, assignment):
+    """Drops every cached report of an assignment, e.g. once a new
+    submission may have become the source of any of its sentences."""
+
+    db.reports.delete_many({"assignment": assignment})
+
+
+def engine_section(engine, submission, other):
+    """Returns the section of a similarity report listing the matches an
+    engine explains between two submissions, and whether it is complete.
+
+    NOTE: submissions made before an engine was enabled, or by an older
+          version of it, are fingerprinted again by the migrator, see
+          migrate.py, never during a request. Until then the section
+          only says so.
+    """
+
+    res = ""
+    res += ("--------------- " + engine.title + " ---------------")
+    res += ("\n")
+
+    if not all(
+        engine.field in sub and engine.isCurrent(sub[engine.field])
+        for sub in (submission, other)
+    ):
+        res += ("Not available yet, please check back later")
+        res += ("\n")
+        res += ("\n")
+        return res, False
+
+    matches = engine.explain(
+        submission[engine.field], other[engine.field],
+        submission["contents"], other["contents"]
+    )
+    res += ("# of Matches: " + str(len(matches)))
+    res += ("\n")
+    res += ("\n")
+    for s1, s2 in matches:
+        res += ("Original: " + s1)
+        res += ("\n")
+        res += ("Similar: " + s2)
+        res += ("\n")
+        res += ("\n")
+    return res, True
+
+
+def build_report(db, submission, other, engines):
+    """Returns the similarity report comparing a submission with another
+    one, the ids of the other submissions it quotes, and whether every
+    section of it is complete.
+
+    Only stored fingerprints are read, nothing is tokenized.
+    """
+
+    res = ""
+    res += ("--------------- Similarity Report ---------------")
+    res += ("\n")
+    res += ("Similarity Score: " + str(submission["simscore"]))
+    res += ("\n")
+
+    # NOTE: the best containment and coverage may come from submissions
+    #       other than the one this report compares against
+    # share of this submission found in a single other submission
+    res += ("Containment: " + str(submission.get("containment")))
+    res += ("\n")
+    # share of a single other submission found in this one
+    res += ("Coverage: " + str(submission.get("coverage")))
+    res += ("\n")
+    res += ("\n")
+
+    # one section per engine of the course that can explain its matches
+    complete = True
+    for engine in engines:
+        if engine.title:
+            section, done = engine_section(engine, submission, other)
+            res += section
+            complete = complete and done
+
+    # the closest sentence in the whole assignment for every sentence, so a
+    # paper stitched together from several classmates shows each of them
+    sources = []
+    if getEngine("simhash") in engines:
+        section, sources = sources_report(db, submission)
+        res += section
+        if sources is None:
+            complete, sources = False, []
+
+    return res, sources, complete
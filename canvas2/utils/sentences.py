@@ -0,0 +1,144 @@
+import numpy as np
+
+from ..plagiarism.engines import getEngine
+from ..plagiarism.simhash.similarsubstrings import HammingIndex
+
+# sentences this many bits apart or closer are matched, as in
+# getSimilarSentences
+MAX_DISTANCE = 8
+
+
+def _hashes(submission):
+    """Returns a submission's sentence simhashes, or None if it has no
+    current simhash fingerprint."""
+
+    engine = getEngine("simhash")
+    data = submission.get(engine.field)
+    if data is None or not engine.isCurrent(data):
+        return None
+    return engine.decode(data)[0]
+
+
+def assignment_sentences(db, submission):
+    """Returns the sentence simhashes of every other submission in a
+    submission's assignment, along with the submission and the number of
+    the sentence each came from, as three arrays.
+
+    Only the stored fingerprints are read, one document per submission.
+    Submissions without a current simhash fingerprint are left out, until
+    the migrator fingerprints them again, see utils/migrate.py.
+    """
+
+    engine = getEngine("simhash")
+    hashes, owners, numbers = [], [], []
+    others = db.submissions.find(
+        {
+            "assignment": submission["assignment"],
+            "_id": {"$ne": submission["_id"]},
+            engine.field: {"$exists": True},
+        },
+        {engine.field: 1},
+    ).sort("_id", 1)
+    for other in others:
+        other_hashes = _hashes(other)
+        if other_hashes is None:
+            continue
+        hashes.append(other_hashes)
+        owners.extend([other["_id"]] * len(other_hashes))
+        numbers.append(np.arange(1, len(other_hashes) + 1))
+
+    if not hashes:
+        return np.zeros(0, np.uint64), [], np.zeros(0, np.int64)
+    return np.concatenate(hashes), owners, np.concatenate(numbers)
+
+
+def sentence_sources(db, submission):
+    """Returns the closest sentence of any other submission in the
+    assignment for every sentence of a submission.
+
+    The assignment's sentences are matched in memory through a
+    HammingIndex, so a paper stitched together from several classmates
+    shows each of them. Returns (sentence, other submission, other
+    sentence, distance) tuples ordered by sentence, for the sentences that
+    have a source within MAX_DISTANCE bits, or None if the submission has
+    no current simhash fingerprint yet.
+    """
+
+    hashes = _hashes(submission)
+    if hashes is None:
+        return None
+
+    others, owners, numbers = assignment_sentences(db, submission)
+    if not len(hashes) or not len(others):
+        return []
+
+    # closest first, ties going to the earliest submission and sentence,
+    # i.e. the first position found
+    index = HammingIndex(others, MAX_DISTANCE)
+    sources = []
+    for i, h in enumerate(hashes.tolist(), 1):
+        positions, distances = index.query(h)
+        if len(positions):
+            best = int(np.argmin(distances))
+            position = int(positions[best])
+            sources.append(
+                (i, owners[position], int(numbers[position]),
+                 int(distances[best]))
+            )
+    return sources
+
+
+def sources_report(db, submission):
+    """Returns the Sentence Sources section of a similarity report, along
+    with the ids of the submissions it quotes.
+
+    The ids are None while the submission has no current simhash
+    fingerprint, in which case the section only says so.
+    """
+
+    engine = getEngine("simhash")
+    res = ""
+    res += ("--------------- Sentence Sources ---------------")
+    res += ("\n")
+
+    sources = sentence_sources(db, submission)
+    if sources is None:
+        res += ("Not available yet, please check back later")
+        res += ("\n")
+        res += ("\n")
+        return res, None
+
+    others = {
+        sub["_id"]: sub
+        for sub in db.submissions.find(
+            {"_id": {"$in": list({other for _, other, _, _ in sources})}},
+            {"contents": 1, "user": 1, engine.field: 1}
+        )
+    }
+    names = {
+        u["_id"]: u["lastname"] + ", " + u["firstname"]
+        for u in db.users.find(
+            {"_id": {"$in": [sub.get("user") for sub in others.values()]}},
+            {"firstname": 1, "lastname": 1}
+        )
+    }
+
+    res += ("# of Sources: " + str(len(others)))
+    res += ("\n")
+    res += ("\n")
+    for i, other_id, j, distance in sources:
+        # skip sources deleted in the meantime
+        other = others.get(other_id)
+        if not other or _hashes(other) is None:
+            continue
+        res += ("Original: " + engine.sentence(
+            submission[engine.field], submission["contents"], i
+        ))
+        res += ("\n")
+        res += ("Source (" + names.get(other.get("user"), "Unknown")
+                + "): " + engine.sentence(
+                    other[engine.field], other["contents"], j
+                ))
+        res += ("\n")
+        res += ("\n")
+    return res, list(others)
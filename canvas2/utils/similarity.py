@@ -0,0 +1,218 @@
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from ..plagiarism.jaccard.minhash import NUM_PERM, estimateScores, \
+    signatureFromFingerprint
+from .lsh import band_layout, index_submission, remove_submission
+from .reports import invalidate_submissions
+
+# (score field, matched submission field) of every stored measure, in the
+# order _scores returns them. simscore is the Jaccard similarity,
+# containment the share of a submission found in another one, and coverage
+# the share of another submission found in this one, so a short submission
+# copied whole into a long one scores 1.0 on containment and the long one
+# 1.0 on coverage, however diluted their simscore is
+MEASURES = (
+    ("simscore", "simsub"),
+    ("containment", "containsub"),
+    ("coverage", "coversub"),
+)
+
+
+def ensure_indexes(db):
+    """Creates the indexes used to rank and rescore submissions."""
+
+    for score_field, sub_field in MEASURES:
+        # an assignment's submissions ranked by any measure
+        db.submissions.create_index(
+            [("assignment", ASCENDING), (score_field, DESCENDING)]
+        )
+
+        # used to rescore the matches of a deleted submission
+        db.submissions.create_index(sub_field, sparse=True)
+
+
+def _candidates(db, submission, threshold):
+    """Returns the ids of submissions sharing a band bucket with this one."""
+
+    bands, rows = band_layout(threshold, NUM_PERM)
+    buckets = db.lsh_buckets.find(
+        {
+            "assignment": submission["assignment"],
+            "bands": bands,
+            "rows": rows,
+            "submissions": submission["_id"],
+        },
+        {"submissions": 1},
+    )
+    candidates = set()
+    for bucket in buckets:
+        candidates.update(bucket["submissions"])
+    candidates.discard(submission["_id"])
+    return candidates
+
+
+def _scores(db, submission, threshold):
+    """Returns (id, simscore, containment, coverage) for every candidate
+    match of a submission.
+
+    All three come from the same signature comparison, see estimateScores.
+    """
+
+    signature = signatureFromFingerprint(submission["fingerprint"])
+    others = db.submissions.find(
+        {
+            "_id": {"$in": list(_candidates(db, submission, threshold))},
+            "fingerprint": {"$exists": True},
+        },
+        {"fingerprint": 1},
+    )
+    return [
+        (other["_id"], *(round(score, 2) for score in estimateScores(
+            signature, signatureFromFingerprint(other["fingerprint"])
+        )))
+        for other in others
+    ]
+
+
+def _set_best(db, submission_id, scores):
+    """Stores the best of a submission's scores for every measure."""
+
+    if scores:
+        update = {"$set": {}}
+        for i, (score_field, sub_field) in enumerate(MEASURES, 1):
+            best = max(scores, key=lambda x: x[i])
+            update["$set"][score_field] = best[i]
+            update["$set"][sub_field] = best[0]
+    else:
+        update = {
+            "$set": {score_field: 0.0 for score_field, _ in MEASURES},
+            "$unset": {sub_field: "" for _, sub_field in MEASURES},
+        }
+    db.submissions.update_one({"_id": submission_id}, update)
+    invalidate_submissions(db, [submission_id])
+
+
+def _update_neighbours(db, submission_id, scores):
+    """Makes a submission the best match of every neighbour it beats."""
+
+    # containment and coverage swap places when seen from the neighbour
+    updates = []
+    for other_id, simscore, containment, coverage in scores:
+        seen = (simscore, coverage, containment)
+        for (score_field, sub_field), score in zip(MEASURES, seen):
+            # only touch neighbours whose best match this submission beats
+            updates.append(UpdateOne(
+                {
+                    "_id": other_id,
+                    "$or": [
+                        {score_field: {"$lt": score}},
+                        {score_field: {"$exists": False}},
+                    ],
+                },
+                {"$set": {score_field: score, sub_field: submission_id}},
+            ))
+    if updates:
+        db.submissions.bulk_write(updates, ordered=False)
+
+    # any of them may have a new best match now
+    invalidate_submissions(db, [other_id for other_id, *_ in scores])
+
+
+def score_submission(db, submission, threshold):
+    """Scores a submission against the rest of its assignment.
+
+    The submission is added to the band index if it is not indexed under
+    the current threshold yet, then compared with its candidates only. Its
+    own best match is stored, and every neighbour it beats the current best
+    match of is updated too, so nothing has to be recomputed when the
+    assignment page is viewed.
+    """
+
+    layout = band_layout(threshold, NUM_PERM)
+    signature = signatureFromFingerprint(submission["fingerprint"])
+    if submission.get("lsh") != layout:
+        index_submission(
+            db, submission["assignment"], submission["_id"], signature,
+            threshold,
+        )
+        db.submissions.update_one(
+            {"_id": submission["_id"]},
+            {"$set": {"lsh": layout}}
+        )
+
+    # an exact copy already scores 1.0, the highest possible, so nothing
+    # needs comparing. every other submission matches this one exactly as
+    # well as it matches the copy, so only the copy itself can be beaten
+    if submission.get("digest"):
+        duplicate = db.submissions.find_one(
+            {
+                "assignment": submission["assignment"],
+                "digest": submission["digest"],
+                "_id": {"$ne": submission["_id"]},
+            },
+            {"_id": 1}
+        )
+        if duplicate:
+            scores = [(duplicate["_id"], 1.0, 1.0, 1.0)]
+            _set_best(db, submission["_id"], scores)
+            _update_neighbours(db, submission["_id"], scores)
+            return
+
+    scores = _scores(db, submission, threshold)
+    _set_best(db, submission["_id"], scores)
+    _update_neighbours(db, submission["_id"], scores)
+
+
+def rescore_submission(db, submission_id, threshold):
+    """Recomputes a submission's best matches from scratch."""
+
+    submission = db.submissions.find_one(
+        {"_id": submission_id},
+        {"assignment": 1, "fingerprint": 1},
+    )
+    if submission and "fingerprint" in submission:
+        _set_best(db, submission_id, _scores(db, submission, threshold))
+
+
+def forget_submission(db, submission_id, threshold):
+    """Removes a deleted submission from the index and from best matches.
+
+    Submissions whose best match on any measure was the deleted one are
+    rescored.
+    """
+
+    remove_submission(db, submission_id)
+    invalidate_submissions(db, [submission_id])
+    matched = db.submissions.find(
+        {"$or": [{sub_field: submission_id} for _, sub_field in MEASURES]},
+        {"_id": 1}
+    )
+    for other in matched:
+        rescore_submission(db, other["_id"], threshold)
+
+
+def backfill_scores(db, threshold):
+    """Scores every fingerprinted submission not indexed under the current
+    threshold, i.e. ones made before scoring moved to submission time, or
+    every submission after the threshold has been changed, and ones scored
+    before containment was stored.
+
+    Returns the number of submissions scored.
+    """
+
+    layout = band_layout(threshold, NUM_PERM)
+    scored = 0
+    pending = db.submissions.find(
+        {
+            "fingerprint": {"$exists": True},
+            "$or": [
+                {"lsh": {"$ne": layout}},
+                {"containment": {"$exists": False}},
+            ],
+        },
+        {"assignment": 1, "fingerprint": 1, "lsh": 1},
+    )
+    for submission in pending:
+        score_submission(db, submission, threshold)
+        scored += 1
+    return scored
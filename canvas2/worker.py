@@ -0,0 +1,182 @@
+import argparse
+import os
+import socket
+import time
+import traceback
+
+from pymongo import MongoClient
+
+from .plagiarism.simhash.tokenizer import loadTokenizer
+from .utils import jobs
+from .utils.contents import fingerprint_contents, submission_engines
+from .utils.postings import index_submission, remove_postings
+from .utils.reports import engines_key, invalidate_assignment
+from .utils.similarity import score_submission, forget_submission
+
+
+def fingerprint_submission(db, payload, threshold):
+    """Fingerprints a stored submission with its course's engines and
+    scores it.
+
+    The submission's `status` moves from "queued" to "processing" to "done",
+    so the UI can poll it. A submission deleted in the meantime is skipped.
+    """
+
+    submission = db.submissions.find_one(
+        {"_id": payload["submission"]},
+        {"assignment": 1, "class": 1, "contents": 1, "seq": 1},
+    )
+    if not submission:
+        return
+
+    db.submissions.update_one(
+        {"_id": submission["_id"]},
+        {"$set": {"status": "processing"}}
+    )
+
+    course = db.classes.find_one({"_id": submission.get("class")})
+    selected = submission_engines(course)
+
+    # each engine stores its fingerprint in its own field, e.g. winnowing
+    # keeps positions so the similarity report can locate shared passages
+    # NOTE: identical texts share their fingerprints through the contents
+    #       store, so resubmissions and copies are not fingerprinted again
+    digest, fingerprints = fingerprint_contents(
+        db, submission["contents"], selected
+    )
+    submission.update(fingerprints, digest=digest)
+    db.submissions.update_one(
+        {"_id": submission["_id"]},
+        {
+            "$set": {
+                **fingerprints,
+                "digest": digest,
+                "fingerprinted": engines_key(selected),
+            }
+        }
+    )
+    score_submission(db, submission, threshold)
+
+    # make it findable from every other assignment and course
+    if "winnowing" in submission:
+        submission["seq"] = index_submission(db, submission)
+
+    # its sentences may now be the closest source of any other submission's
+    if "simhash" in submission:
+        invalidate_assignment(db, submission["assignment"])
+
+    # if it was deleted while being scored, undo the scoring
+    result = db.submissions.update_one(
+        {"_id": submission["_id"]},
+        {"$set": {"status": "done"}}
+    )
+    if result.matched_count == 0:
+        forget_submission(db, submission["_id"], threshold)
+        remove_postings(db, submission)
+
+
+def failed_submission(db, payload):
+    """Marks a submission that could not be fingerprinted."""
+
+    db.submissions.update_one(
+        {"_id": payload["submission"]},
+        {"$set": {"status": "failed"}}
+    )
+
+
+# job kind -> (handler, called once a job has used up its attempts)
+HANDLERS = {
+    "fingerprint": (fingerprint_submission, failed_submission),
+}
+
+
+def run_job(db, job, threshold):
+    """Runs one claimed job and records the outcome.
+
+    A job of a kind this worker does not know fails like any other, so it
+    is retried, e.g. by a newer worker, rather than killing this one.
+    """
+
+    on_failure = None
+    try:
+        handler, on_failure = HANDLERS[job["kind"]]
+        handler(db, job["payload"], threshold)
+    except Exception as e:
+        traceback.print_exc()
+        if not jobs.fail(db, job, e) and on_failure:
+            on_failure(db, job["payload"])
+    else:
+        jobs.complete(db, job)
+
+
+def reap_jobs(db):
+    """Runs the failure hook of every job whose worker died on its last
+    attempt."""
+
+    for job in jobs.reap(db):
+        if job["kind"] in HANDLERS:
+            _, on_failure = HANDLERS[job["kind"]]
+            on_failure(db, job["payload"])
+
+
+def work(db, worker, threshold, poll_interval=1.0,
+         visibility_timeout=jobs.VISIBILITY_TIMEOUT, burst=False):
+    """Claims and runs jobs until stopped.
+
+    With burst set, returns once the queue is empty instead of polling.
+    Returns the number of jobs run.
+    """
+
+    count = 0
+    while True:
+        reap_jobs(db)
+        job = jobs.claim(db, worker, visibility_timeout)
+        if job:
+            run_job(db, job, threshold)
+            count += 1
+        elif burst:
+            return count
+        else:
+            time.sleep(poll_interval)
+
+
+def main():
+    """Entry point of canvas2-worker."""
+
+    parser = argparse.ArgumentParser(
+        description="Runs queued plagiarism jobs. Start one per core, on as "
+        + "many nodes as needed."
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=1.0,
+        help="seconds to wait when the queue is empty",
+    )
+    parser.add_argument(
+        "--visibility-timeout", type=int, default=jobs.VISIBILITY_TIMEOUT,
+        help="seconds before a job held by a dead worker is retried",
+    )
+    parser.add_argument(
+        "--burst", action="store_true",
+        help="exit once the queue is empty",
+    )
+    args = parser.parse_args()
+
+    # NOTE: MONGO_URI ends with the database name, see utils/db.py
+    db = MongoClient(os.environ["MONGO_URI"]).get_default_database()
+    jobs.ensure_indexes(db)
+    threshold = float(os.environ.get("SIMILARITY_THRESHOLD", 0.3))
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    # load the sentence and word tokenizers before the first job needs them
+    loadTokenizer()
+
+    print(f"Worker {worker} started")
+    count = work(
+        db, worker, threshold, args.poll_interval, args.visibility_timeout,
+        args.burst,
+    )
+    print(f"Ran {count} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,28 @@ from setuptools.command.develop import develop
 
 def setup_nltk():
     import nltk
-    required = ["stopwords", "brown", "omw-1.4", "wordnet", "punkt"]
+    required = ["stopwords", "brown", "omw-1.4", "wordnet", "punkt",
+                "punkt_tab"]
     for x in required:
         nltk.download(x)
 
+    # compile the corpora into the lexicon the normalizer memory-maps
+    from canvas2.plagiarism.jaccard.lexicon import buildLexicon
+    buildLexicon()
+
 
 class _PostInstall(install):
     def run(self):
         install.run(self)
         self.execute(setup_nltk, [],
-                     msg="Installing NLTK corpora and tokenizers")
+                     msg="Installing NLTK corpora and building lexicon")
 
 
 class _PostDevelop(develop):
     def run(self):
         develop.run(self)
         self.execute(setup_nltk, [],
-                     msg="Installing NLTK corpora and tokenizers")
+                     msg="Installing NLTK corpora and building lexicon")
 
 
 setup(
@@ -33,7 +38,11 @@ setup(
     install_requires=[
         'flask',
         'numpy',
+        'scipy',
         'nltk',
     ],
+    entry_points={
+        'console_scripts': ['canvas2-worker=canvas2.worker:main'],
+    },
     cmdclass={'install': _PostInstall, 'develop': _PostDevelop},
 )
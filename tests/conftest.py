@@ -19,6 +19,12 @@ def init_db(db):
     db.drop_collection("enrollments")
     db.drop_collection("assignments")
     db.drop_collection("submissions")
+    db.drop_collection("lsh_buckets")
+    db.drop_collection("jobs")
+    db.drop_collection("postings")
+    db.drop_collection("counters")
+    db.drop_collection("contents")
+    db.drop_collection("reports")
 
     # insert users
     # NOTE: username == password for testing purposes
@@ -236,7 +242,9 @@ def init_nltk():
     """
     Initializes the NLTK library with required corpora and tokenizers.
     """
-    required = ["stopwords", "brown", "omw-1.4", "wordnet", "punkt"]
+    required = [
+        "stopwords", "brown", "omw-1.4", "wordnet", "punkt", "punkt_tab"
+    ]
     for x in required:
         nltk.download(x)
 
@@ -253,4 +253,22 @@ def test_panel_search(client):
         # ensure we got a 200
         assert res.status_code == 200
         results = json.loads(res.get_data(as_text=True))
-        assert len(results) == 2
\ No newline at end of file
+        assert len(results) == 2
+
+
+def test_stats(client):
+    """Ensure that admins can read the worker statistics"""
+
+    # set admin user
+    setuser(client, "admin")
+
+    # with context...
+    with client:
+
+        res = client.get("/admin/stats")
+
+        assert res.status_code == 200
+        stats = json.loads(res.data)
+        assert "hits" in stats["normalization_cache"]
+        assert "evictions" in stats["normalization_cache"]
+        assert "minhash" in stats["engines"]
@@ -1,7 +1,11 @@
+import json
 import pytest
 from bson import ObjectId
 from datetime import datetime, timedelta
 
+from canvas2.plagiarism.engines import getEngine
+from canvas2.plagiarism.fingerprint import decodeFingerprint
+from canvas2.worker import work
 from .utils import setuser, setbogus
 
 ###############################################################################
@@ -333,10 +337,40 @@ def test_submitassg_good(client):
         )
         assert submission is not None
 
+        # ensure it was queued rather than checked during the request
+        assert submission["status"] == "queued"
+        assert "fingerprint" not in submission
+        assert pytest.db["jobs"].count_documents(
+            {"payload.submission": submission["_id"], "status": "queued"}
+        ) == 1
+
+        # run the queue
+        work(pytest.db, "pytest", 0.3, burst=True)
+        submission = pytest.db["submissions"].find_one(
+            {"_id": submission["_id"]}
+        )
+        assert submission["status"] == "done"
+
+        # ensure it was fingerprinted and added to the band index
+        fingerprint = decodeFingerprint(submission["fingerprint"])
+        assert fingerprint.engine == "minhash"
+        assert len(fingerprint.arrays[0]) == 128
+        assert pytest.db["lsh_buckets"].count_documents(
+            {"submissions": submission["_id"]}
+        ) == submission["lsh"][0]
+        assert decodeFingerprint(submission["winnowing"]).engine \
+            == "winnowing"
+
         # clean up
         pytest.db["submissions"].delete_one(
             {"assignment": assignment["_id"], "user": user["_id"]}
         )
+        pytest.db["lsh_buckets"].delete_many(
+            {"assignment": assignment["_id"]}
+        )
+        pytest.db["jobs"].delete_many(
+            {"payload.submission": submission["_id"]}
+        )
 
 
 def test_submitassg_noauth(client):
@@ -678,4 +712,118 @@ def test_delete_submission(client):
         assignment = pytest.db["submissions"].find_one({
             "_id": sub_id
         })
-        assert assignment is None
\ No newline at end of file
+        assert assignment is None
+
+
+def test_similarity_matrix(client):
+    """Tests teacher's ability to load the similarity heatmap data"""
+
+    # set teacher
+    setuser(client, "teacher")
+
+    # get assignment id from db
+    assignment = pytest.db["assignments"].find_one(
+        {"title": "Test Assignment 1"}
+    )
+
+    # use client context
+    with client:
+
+        res = client.get(
+            f"/secretary/a/{assignment['_id']}/similarity-matrix"
+        )
+
+        # check to make sure we were allowed
+        assert res.status_code == 200
+
+        # ensure the matrix is square and labelled
+        data = json.loads(res.data)
+        assert len(data["matrix"]) == len(data["labels"])
+        assert all(len(row) == len(data["labels"]) for row in data["matrix"])
+
+
+def test_similarity_matrix_stale(client):
+    """Tests that stale fingerprints are left out of the heatmap"""
+
+    # set teacher
+    user = setuser(client, "teacher")
+
+    # get assignment id from db
+    assignment = pytest.db["assignments"].find_one(
+        {"title": "Test Assignment 1"}
+    )
+
+    # a submission fingerprinted by another engine, like an old version
+    sub_id = pytest.db["submissions"].insert_one({
+        "assignment": assignment["_id"],
+        "user": user["_id"],
+        "contents": "Fingerprinted long ago",
+        "fingerprint": getEngine("winnowing").fingerprint(
+            "Fingerprinted long ago"
+        ),
+    }).inserted_id
+
+    # use client context
+    with client:
+
+        res = client.get(
+            f"/secretary/a/{assignment['_id']}/similarity-matrix"
+        )
+        assert res.status_code == 200
+
+        # ensure it was left out
+        data = json.loads(res.data)
+        assert str(sub_id) not in data["submissions"]
+
+    # clean up
+    pytest.db["submissions"].delete_one({"_id": sub_id})
+
+
+def test_similarity_matrix_engine(client):
+    """Tests picking the engine that draws the similarity heatmap"""
+
+    # set teacher
+    setuser(client, "teacher")
+
+    # get assignment id from db
+    assignment = pytest.db["assignments"].find_one(
+        {"title": "Test Assignment 1"}
+    )
+
+    # use client context
+    with client:
+
+        res = client.get(
+            f"/secretary/a/{assignment['_id']}/similarity-matrix"
+            + "?engine=winnowing"
+        )
+        assert res.status_code == 200
+
+        # ensure unknown engines are refused
+        res = client.get(
+            f"/secretary/a/{assignment['_id']}/similarity-matrix"
+            + "?engine=bogus"
+        )
+        assert res.status_code == 400
+
+
+def test_similarity_matrix_student(client):
+    """Tests if students are able to load the similarity heatmap data"""
+
+    # set student
+    setuser(client, "student1")
+
+    # get assignment id from db
+    assignment = pytest.db["assignments"].find_one(
+        {"title": "Test Assignment 1"}
+    )
+
+    # use client context
+    with client:
+
+        res = client.get(
+            f"/secretary/a/{assignment['_id']}/similarity-matrix"
+        )
+
+        # check to make sure we were denied
+        assert res.status_code == 401
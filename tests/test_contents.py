@@ -0,0 +1,66 @@
+import pytest
+from bson import ObjectId
+
+from canvas2.plagiarism.engines import getEngine
+from canvas2.utils.contents import fingerprint_contents, content_digest
+from canvas2.utils.similarity import score_submission
+
+THRESHOLD = 0.3
+ENGINES = [getEngine("minhash"), getEngine("winnowing")]
+
+
+def test_reuse():
+    """Tests that identical texts share their fingerprints"""
+
+    text = "four score and seven years ago our fathers brought forth a nation"
+    digest, first = fingerprint_contents(pytest.db, text, ENGINES)
+    assert set(first) == {"fingerprint", "winnowing"}
+
+    # ensure the stored copy is used, even with trailing whitespace
+    calls = getEngine("minhash").stats()["fingerprint"]["calls"]
+    assert fingerprint_contents(pytest.db, text + "\n", ENGINES) \
+        == (digest, first)
+    assert getEngine("minhash").stats()["fingerprint"]["calls"] == calls
+
+    # ensure the normalized words are reused for missing fingerprints
+    pytest.db["contents"].update_one(
+        {"_id": digest}, {"$unset": {"fingerprints.fingerprint": ""}}
+    )
+    assert fingerprint_contents(pytest.db, text, ENGINES)[1] == first
+
+    # ensure different texts get different entries
+    assert content_digest(text.upper()) != digest
+
+    # clean up
+    pytest.db["contents"].delete_one({"_id": digest})
+
+
+def test_duplicate_score():
+    """Tests that exact copies score 1.0 without being compared"""
+
+    assignment = ObjectId()
+    text = "it was the best of times, it was the worst of times"
+
+    ids = []
+    for _ in range(2):
+        digest, fingerprints = fingerprint_contents(pytest.db, text, ENGINES)
+        submission = {
+            "assignment": assignment,
+            "contents": text,
+            "digest": digest,
+            **fingerprints,
+        }
+        pytest.db["submissions"].insert_one(submission)
+        score_submission(pytest.db, submission, THRESHOLD)
+        ids.append(submission["_id"])
+
+    # ensure both copies point at each other
+    first = pytest.db["submissions"].find_one({"_id": ids[0]})
+    second = pytest.db["submissions"].find_one({"_id": ids[1]})
+    assert (first["simscore"], first["simsub"]) == (1.0, ids[1])
+    assert (second["simscore"], second["simsub"]) == (1.0, ids[0])
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+    pytest.db["lsh_buckets"].delete_many({"assignment": assignment})
+    pytest.db["contents"].delete_one({"_id": digest})
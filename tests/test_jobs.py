@@ -0,0 +1,131 @@
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+
+from canvas2.utils import jobs
+from canvas2.worker import work
+
+
+def test_claim_once():
+    """Tests that a job is only handed to one worker"""
+
+    job_id = jobs.enqueue(pytest.db, "test", {})
+
+    job = jobs.claim(pytest.db, "worker1")
+    assert job["_id"] == job_id
+    assert job["attempts"] == 1
+    assert jobs.claim(pytest.db, "worker2") is None
+
+    # ensure a finished job is not claimed again
+    jobs.complete(pytest.db, job)
+    assert pytest.db["jobs"].find_one({"_id": job_id})["status"] == "done"
+    assert jobs.claim(pytest.db, "worker2") is None
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
+
+
+def test_lease_expiry():
+    """Tests that a job held by a dead worker is taken over"""
+
+    job_id = jobs.enqueue(pytest.db, "test", {})
+    job = jobs.claim(pytest.db, "worker1", visibility_timeout=-1)
+
+    # worker1 dies, so its lease runs out
+    job = jobs.claim(pytest.db, "worker2")
+    assert job["_id"] == job_id
+    assert job["worker"] == "worker2"
+    assert job["attempts"] == 2
+
+    # ensure the dead worker can no longer finish it
+    jobs.complete(pytest.db, {"_id": job_id, "worker": "worker1"})
+    assert pytest.db["jobs"].find_one({"_id": job_id})["status"] == "running"
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
+
+
+def test_lease_expiry_last_attempt():
+    """Tests that a job whose worker died on its last attempt is failed"""
+
+    submission_id = pytest.db["submissions"].insert_one(
+        {"status": "processing"}
+    ).inserted_id
+    job_id = jobs.enqueue(
+        pytest.db, "fingerprint", {"submission": submission_id},
+        max_attempts=1,
+    )
+    jobs.claim(pytest.db, "worker1", visibility_timeout=-1)
+
+    # worker1 dies, and the job must not be leased again
+    assert jobs.claim(pytest.db, "worker2") is None
+    assert work(pytest.db, "worker2", 0.3, burst=True) == 0
+    job = pytest.db["jobs"].find_one({"_id": job_id})
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+
+    # ensure the failure hook ran
+    submission = pytest.db["submissions"].find_one({"_id": submission_id})
+    assert submission["status"] == "failed"
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
+    pytest.db["submissions"].delete_one({"_id": submission_id})
+
+
+def test_retries():
+    """Tests that failed jobs are retried until they run out of attempts"""
+
+    job_id = jobs.enqueue(pytest.db, "test", {}, max_attempts=2)
+
+    # first failure is retried later, not right away
+    job = jobs.claim(pytest.db, "worker1")
+    assert jobs.fail(pytest.db, job, "oops")
+    job = pytest.db["jobs"].find_one({"_id": job_id})
+    assert job["status"] == "queued"
+    # NOTE: pymongo returns naive datetimes, in UTC
+    now = datetime.now(timezone.utc)
+    assert job["run_at"].replace(tzinfo=timezone.utc) > now
+    assert jobs.claim(pytest.db, "worker1") is None
+
+    # second failure is final
+    pytest.db["jobs"].update_one(
+        {"_id": job_id},
+        {"$set": {"run_at": now - timedelta(seconds=1)}}
+    )
+    job = jobs.claim(pytest.db, "worker1")
+    assert not jobs.fail(pytest.db, job, "oops")
+    job = pytest.db["jobs"].find_one({"_id": job_id})
+    assert job["status"] == "failed"
+    assert job["error"] == "oops"
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
+
+
+def test_worker_deleted_submission():
+    """Tests that the worker skips submissions deleted before it got to them"""
+
+    job_id = jobs.enqueue(
+        pytest.db, "fingerprint", {"submission": ObjectId()}
+    )
+
+    assert work(pytest.db, "pytest", 0.3, burst=True) == 1
+    assert pytest.db["jobs"].find_one({"_id": job_id})["status"] == "done"
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
+
+
+def test_worker_unknown_kind():
+    """Tests that a job of an unknown kind fails instead of the worker"""
+
+    job_id = jobs.enqueue(pytest.db, "nonexistent", {}, max_attempts=1)
+
+    assert work(pytest.db, "pytest", 0.3, burst=True) == 1
+    job = pytest.db["jobs"].find_one({"_id": job_id})
+    assert job["status"] == "failed"
+    assert "nonexistent" in job["error"]
+
+    # clean up
+    pytest.db["jobs"].delete_one({"_id": job_id})
@@ -0,0 +1,122 @@
+import pytest
+from bson import ObjectId
+
+from canvas2.plagiarism.engines import getEngine
+from canvas2.plagiarism.fingerprint import decodeFingerprint
+from canvas2.utils import jobs
+from canvas2.utils.migrate import migrate_fingerprints, \
+    refingerprint_submissions, requeue_submissions
+
+
+def test_migrate_parsedcontents():
+    """Tests converting a submission stored as a shingle set string"""
+
+    # insert a submission in the old format
+    sub_id = pytest.db["submissions"].insert_one({
+        "assignment": ObjectId(),
+        "contents": "This submission predates fingerprints!",
+        "parsedContents": repr({"submi", "ubmis", "bmiss"}),
+    }).inserted_id
+
+    # run the migration
+    assert migrate_fingerprints(pytest.db) >= 1
+
+    # ensure it was converted
+    submission = pytest.db["submissions"].find_one({"_id": sub_id})
+    assert "parsedContents" not in submission
+    assert decodeFingerprint(submission["fingerprint"]).engine == "minhash"
+
+    # clean up
+    pytest.db["submissions"].delete_one({"_id": sub_id})
+
+
+def test_migrate_noexec():
+    """Tests that stored strings are parsed, never executed"""
+
+    # insert a submission with code instead of a set
+    sub_id = pytest.db["submissions"].insert_one({
+        "assignment": ObjectId(),
+        "contents": "Nice try!",
+        "parsedContents": "__import__('os').getcwd()",
+    }).inserted_id
+
+    # run the migration, it should skip the submission
+    migrate_fingerprints(pytest.db)
+
+    # ensure it was left alone
+    submission = pytest.db["submissions"].find_one({"_id": sub_id})
+    assert "fingerprint" not in submission
+
+    # clean up
+    pytest.db["submissions"].delete_one({"_id": sub_id})
+
+
+def test_requeue():
+    """Tests that queued submissions whose job was lost are enqueued again"""
+
+    # a submission saved before the server died, and one with its job
+    lost = pytest.db["submissions"].insert_one(
+        {"assignment": ObjectId(), "status": "queued"}
+    ).inserted_id
+    kept = pytest.db["submissions"].insert_one(
+        {"assignment": ObjectId(), "status": "queued"}
+    ).inserted_id
+    jobs.enqueue(pytest.db, "fingerprint", {"submission": kept})
+
+    # ensure only the lost one is enqueued, and only once
+    assert requeue_submissions(pytest.db, grace=-1) == 1
+    assert requeue_submissions(pytest.db, grace=-1) == 0
+    assert pytest.db["jobs"].count_documents(
+        {"payload.submission": lost}
+    ) == 1
+
+    # ensure ones saved just now are left to the request saving them
+    other = pytest.db["submissions"].insert_one(
+        {"assignment": ObjectId(), "status": "queued"}
+    ).inserted_id
+    assert requeue_submissions(pytest.db) == 0
+
+    # clean up
+    pytest.db["submissions"].delete_many({"_id": {"$in": [lost, kept, other]}})
+    pytest.db["jobs"].delete_many(
+        {"payload.submission": {"$in": [lost, kept]}}
+    )
+
+
+def test_refingerprint():
+    """Tests that submissions missing a current fingerprint get one"""
+
+    course_id = pytest.db["classes"].insert_one(
+        {"code": "MIG001", "engines": ["minhash", "simhash"]}
+    ).inserted_id
+    assignment = ObjectId()
+    text = "Four score and seven years ago. Our fathers brought forth a nation"
+
+    # one made before simhash was enabled, one by an older version of it
+    missing = pytest.db["submissions"].insert_one({
+        "assignment": assignment,
+        "class": course_id,
+        "contents": text,
+        "status": "done",
+    }).inserted_id
+    stale = pytest.db["submissions"].insert_one({
+        "assignment": assignment,
+        "class": course_id,
+        "contents": text + " Conceived in liberty.",
+        "status": "done",
+        "simhash": getEngine("minhash").fingerprint(text),
+    }).inserted_id
+
+    # ensure both are fingerprinted and scored, and only once
+    assert refingerprint_submissions(pytest.db, 0.3) >= 2
+    simhash = getEngine("simhash")
+    for sub_id in (missing, stale):
+        submission = pytest.db["submissions"].find_one({"_id": sub_id})
+        assert simhash.isCurrent(submission["simhash"])
+        assert "simscore" in submission
+    assert refingerprint_submissions(pytest.db, 0.3) == 0
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+    pytest.db["lsh_buckets"].delete_many({"assignment": assignment})
+    pytest.db["classes"].delete_one({"_id": course_id})
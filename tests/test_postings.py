@@ -0,0 +1,75 @@
+import pytest
+
+from canvas2.plagiarism.winnowing.winnowing import winnowFromFingerprint
+from canvas2.plagiarism.postings import decodePostings
+from canvas2.utils.postings import compact_postings, remove_postings, \
+    top_candidates, _keys
+from .utils import add_indexed_submission
+
+
+def test_cross_assignment():
+    """Tests that copies are found across assignments and courses"""
+
+    original = add_indexed_submission("original1.txt")
+    partial = add_indexed_submission("t1.txt")
+    copy = add_indexed_submission("t2.txt")
+
+    # ensure the copy is the best match of the original
+    candidates = top_candidates(pytest.db, original)
+    assert candidates[0][0]["_id"] == copy["_id"]
+    assert candidates[0][0]["assignment"] != original["assignment"]
+    assert all(c[0]["_id"] != original["_id"] for c in candidates)
+    assert len(candidates) == 2
+    assert candidates[1][0]["_id"] == partial["_id"]
+    assert candidates[1][1] < candidates[0][1]
+
+    # ensure compacted postings give the same answer
+    keys = _keys(winnowFromFingerprint(original["winnowing"])[0])
+    compact_postings(pytest.db, keys, tail_limit=1)
+    assert pytest.db["postings"].count_documents(
+        {"_id": {"$in": keys}, "tail.0": {"$exists": True}}
+    ) == 0
+    assert top_candidates(pytest.db, original) == candidates
+
+    # ensure submissions deleted without being removed are skipped
+    pytest.db["submissions"].delete_one({"_id": copy["_id"]})
+    candidates = top_candidates(pytest.db, original, limit=1)
+    assert [c[0]["_id"] for c in candidates] == [partial["_id"]]
+
+    # clean up
+    pytest.db["submissions"].delete_many(
+        {"_id": {"$in": [original["_id"], partial["_id"]]}}
+    )
+    pytest.db["postings"].delete_many({})
+
+
+def test_remove_postings():
+    """Tests that deleted submissions are removed from tails and blocks"""
+
+    original = add_indexed_submission("original1.txt")
+    copy = add_indexed_submission("t2.txt")
+    keys = _keys(winnowFromFingerprint(copy["winnowing"])[0])
+
+    # ensure the copy is pulled from tails and skipped in blocks
+    compact_postings(pytest.db, keys, tail_limit=1)
+    other = add_indexed_submission("t1.txt")
+    pytest.db["submissions"].delete_one({"_id": copy["_id"]})
+    remove_postings(pytest.db, copy)
+    assert pytest.db["postings"].count_documents(
+        {"_id": {"$in": keys}, "tail": copy["seq"]}
+    ) == 0
+    candidates = top_candidates(pytest.db, original)
+    assert [c[0]["_id"] for c in candidates] == [other["_id"]]
+
+    # ensure compaction drops it from the blocks
+    compact_postings(pytest.db, keys, tail_limit=1)
+    for posting in pytest.db["postings"].find({"_id": {"$in": keys}}):
+        assert copy["seq"] not in decodePostings(posting["block"])
+        assert not posting.get("removed")
+    assert top_candidates(pytest.db, original) == candidates
+
+    # clean up
+    pytest.db["submissions"].delete_many(
+        {"_id": {"$in": [original["_id"], other["_id"]]}}
+    )
+    pytest.db["postings"].delete_many({})
@@ -0,0 +1,59 @@
+import pytest
+from bson import ObjectId
+
+from canvas2.plagiarism.engines import getEngine
+from canvas2.utils.reports import cache_report, cached_report
+from canvas2.utils.similarity import forget_submission
+from .utils import THRESHOLD, add_scored_submission
+
+ENGINES = [getEngine("minhash"), getEngine("winnowing")]
+
+
+def test_cache():
+    """Tests that reports are cached per pair and engine versions"""
+
+    submission = {"_id": ObjectId(), "assignment": ObjectId()}
+    other, source = ObjectId(), ObjectId()
+    cache_report(
+        pytest.db, submission, other, ENGINES, "report", sources=[source]
+    )
+    assert cached_report(
+        pytest.db, submission["_id"], other, ENGINES
+    ) == "report"
+
+    # ensure other pairs and other engine versions miss
+    assert cached_report(pytest.db, other, submission["_id"], ENGINES) is None
+    assert cached_report(
+        pytest.db, submission["_id"], other, ENGINES[:1]
+    ) is None
+
+    # ensure deleting a quoted submission invalidates the report
+    forget_submission(pytest.db, source, THRESHOLD)
+    assert cached_report(
+        pytest.db, submission["_id"], other, ENGINES
+    ) is None
+
+
+def test_invalidate():
+    """Tests that rescoring or deleting a submission drops its reports"""
+
+    assignment = ObjectId()
+    text = "four score and seven years ago our fathers brought forth a nation"
+    first = add_scored_submission(assignment, text)
+    second = add_scored_submission(assignment, text + " conceived in liberty")
+    submission = {"_id": first, "assignment": assignment}
+    cache_report(pytest.db, submission, second, ENGINES, "report")
+
+    # ensure a new match of the first submission rescores it
+    add_scored_submission(assignment, text)
+    assert cached_report(pytest.db, first, second, ENGINES) is None
+
+    # ensure deleting the matched submission drops the report
+    cache_report(pytest.db, submission, second, ENGINES, "report")
+    pytest.db["submissions"].delete_one({"_id": second})
+    forget_submission(pytest.db, second, THRESHOLD)
+    assert cached_report(pytest.db, first, second, ENGINES) is None
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+    pytest.db["lsh_buckets"].delete_many({"assignment": assignment})
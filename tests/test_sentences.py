@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from canvas2.plagiarism.engines import getEngine
+from canvas2.utils.sentences import assignment_sentences, sentence_sources
+from .utils import add_simhash_submission
+
+# the hashes of three sentences nobody else wrote
+OWN = [0x0F0F0F0F0F, 0x3333333333, 0x5555555555]
+
+
+def test_sources():
+    """Tests that every sentence is matched to its closest source"""
+
+    assignment = ObjectId()
+    first = add_simhash_submission(assignment, [0x123456789A, OWN[0]])
+    second = add_simhash_submission(assignment, [0xABCDEF0123, OWN[1]])
+    third = add_simhash_submission(assignment, [0x0102030405, OWN[2]])
+
+    # a paper taking one sentence from each classmate, the first slightly
+    # reworded, plus one of its own
+    stitched = add_simhash_submission(assignment, [
+        0x123456789A ^ 0b101,
+        0xABCDEF0123,
+        0xFFFFFFFFFF,
+        0x0102030405,
+    ])
+    assert sentence_sources(pytest.db, stitched) == [
+        (1, first["_id"], 1, 2),
+        (2, second["_id"], 1, 0),
+        (4, third["_id"], 1, 0),
+    ]
+
+    # ensure submissions are only matched within their assignment, and
+    # deleted ones are not matched at all
+    add_simhash_submission(ObjectId(), [0xFFFFFFFFFF])
+    pytest.db["submissions"].delete_one({"_id": second["_id"]})
+    assert [s[0] for s in sentence_sources(pytest.db, stitched)] == [1, 4]
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+
+
+def test_assignment_sentences():
+    """Tests that a lookup reads one document per other submission"""
+
+    assignment = ObjectId()
+    gen = np.random.RandomState(0)
+    for _ in range(5):
+        add_simhash_submission(
+            assignment, gen.randint(0, 1 << 40, size=20, dtype=np.uint64)
+        )
+    mine = add_simhash_submission(assignment, OWN)
+
+    hashes, owners, numbers = assignment_sentences(pytest.db, mine)
+    assert len(hashes) == len(owners) == len(numbers) == 5 * 20
+    assert len(set(owners)) == 5
+    assert mine["_id"] not in owners
+    assert numbers[:3].tolist() == [1, 2, 3]
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+
+
+def test_sources_stale():
+    """Tests that submissions without a current fingerprint are skipped"""
+
+    assignment = ObjectId()
+    submission = {"_id": ObjectId(), "assignment": assignment}
+    assert sentence_sources(pytest.db, submission) is None
+
+    submission["simhash"] = getEngine("minhash").fingerprint("old")
+    assert sentence_sources(pytest.db, submission) is None
+
+    # ensure stale fingerprints are not matched either
+    pytest.db["submissions"].insert_one(dict(submission, _id=ObjectId()))
+    mine = add_simhash_submission(assignment, OWN)
+    assert sentence_sources(pytest.db, mine) == []
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
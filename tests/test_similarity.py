@@ -0,0 +1,70 @@
+import pytest
+from bson import ObjectId
+
+from canvas2.utils.similarity import forget_submission
+from .utils import THRESHOLD, add_scored_submission
+
+
+def test_incremental_scoring():
+    """Tests that submitting updates both the new and matched submission"""
+
+    assignment = ObjectId()
+    text = "four score and seven years ago our fathers brought forth a nation"
+
+    first = add_scored_submission(assignment, text)
+    unrelated = add_scored_submission(
+        assignment, "it was the best of times, it was the worst of times"
+    )
+    second = add_scored_submission(assignment, text + " conceived in liberty")
+
+    # ensure both copies point at each other
+    first_sub = pytest.db["submissions"].find_one({"_id": first})
+    second_sub = pytest.db["submissions"].find_one({"_id": second})
+    assert first_sub["simsub"] == second
+    assert second_sub["simsub"] == first
+    assert first_sub["simscore"] == second_sub["simscore"] > THRESHOLD
+
+    # ensure the unrelated submission was not matched
+    unrelated_sub = pytest.db["submissions"].find_one({"_id": unrelated})
+    assert unrelated_sub["simscore"] == 0.0
+
+    # ensure deleting one copy clears the other's match
+    pytest.db["submissions"].delete_one({"_id": second})
+    forget_submission(pytest.db, second, THRESHOLD)
+    first_sub = pytest.db["submissions"].find_one({"_id": first})
+    assert "simsub" not in first_sub
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+    pytest.db["lsh_buckets"].delete_many({"assignment": assignment})
+
+
+def test_containment():
+    """Tests that a short submission copied into a long one is contained"""
+
+    assignment = ObjectId()
+    short = "four score and seven years ago our fathers brought forth a nation"
+    long = (
+        "it was the best of times, it was the worst of times, it was the age "
+        "of wisdom, it was the age of foolishness, it was the epoch of belief "
+        + short
+        + " conceived in liberty and dedicated to the proposition that all "
+        "men are created equal"
+    )
+
+    first = add_scored_submission(assignment, short)
+    second = add_scored_submission(assignment, long)
+
+    # ensure most of the short one is found in the long one, whatever their
+    # jaccard similarity, and that both directions were stored
+    short_sub = pytest.db["submissions"].find_one({"_id": first})
+    long_sub = pytest.db["submissions"].find_one({"_id": second})
+    assert short_sub["containsub"] == second
+    assert long_sub["coversub"] == first
+    assert short_sub["containment"] == long_sub["coverage"]
+    assert short_sub["containment"] > 0.6 > short_sub["simscore"]
+    assert long_sub["containment"] < 0.6
+
+    # clean up
+    pytest.db["submissions"].delete_many({"assignment": assignment})
+    pytest.db["lsh_buckets"].delete_many({"assignment": assignment})
@@ -1,4 +1,20 @@
+import numpy as np
 import pytest
+from bson import ObjectId
+from pathlib import Path
+
+from canvas2.plagiarism.engines import getEngine
+from canvas2.plagiarism.jaccard.jaccardsimilarity import shingles
+from canvas2.plagiarism.jaccard.minhash import minhashSignature, \
+    signatureToFingerprint
+from canvas2.plagiarism.winnowing.winnowing import winnowFingerprint
+from canvas2.utils.postings import index_submission
+from canvas2.utils.similarity import score_submission
+
+TESTDOCS = Path(__file__).parent.parent / "canvas2" / "plagiarism" / "testdocs"
+
+# similarity threshold used to score submissions in tests
+THRESHOLD = 0.3
 
 
 def setuser(client, username):
@@ -37,3 +53,51 @@ def setbogus(client):
         prelim_session["fname"] = "spoofed"
         prelim_session["lname"] = "user"
         prelim_session["role"] = 9
+
+
+def add_scored_submission(assignment, text):
+    """Inserts a submission with a MinHash fingerprint and scores it"""
+
+    submission = {
+        "assignment": assignment,
+        "contents": text,
+        "fingerprint": signatureToFingerprint(
+            minhashSignature(shingles([text])), 5
+        ),
+    }
+    pytest.db["submissions"].insert_one(submission)
+    score_submission(pytest.db, submission, THRESHOLD)
+    return submission["_id"]
+
+
+def add_simhash_submission(assignment, hashes):
+    """Inserts a submission with a simhash fingerprint of the given
+    sentence hashes"""
+
+    engine = getEngine("simhash")
+    positions = np.arange(len(hashes), dtype=np.int64)
+    submission = {
+        "assignment": assignment,
+        "simhash": engine.encode(
+            0, np.array(hashes, dtype=np.uint64), positions, positions + 1
+        ),
+    }
+    pytest.db["submissions"].insert_one(submission)
+    return submission
+
+
+def add_indexed_submission(name):
+    """Inserts a test document as a submission to its own assignment and
+    adds it to the inverted index"""
+
+    with open(TESTDOCS / name, "r") as f:
+        text = f.read()
+    submission = {
+        "assignment": ObjectId(),
+        "class": ObjectId(),
+        "contents": text,
+        "winnowing": winnowFingerprint(text),
+    }
+    pytest.db["submissions"].insert_one(submission)
+    submission["seq"] = index_submission(pytest.db, submission)
+    return submission